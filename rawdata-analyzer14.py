@@ -3,10 +3,11 @@ import numpy as np
 import openpyxl
 from openpyxl.chart import BarChart, Reference
 from openpyxl.utils.dataframe import dataframe_to_rows
+from rawdata_loader import read_columns
+from rawdata_propulsion import actual_speed, performance_speed, speed_slip
 
 # ---------------------- Load Excel ----------------------
 file_path = r'C:/Users/Laptop-SatyoYuwono/Downloads/RD-ZS.xlsx'
-df = pd.read_excel(file_path, header=None)
 
 # ---------------------- Column Index Map ----------------------
 col_map = {
@@ -41,9 +42,8 @@ col_map = {
     'ae3_kw': 83
 }
 
-# Extract relevant columns
-df_data = df.iloc[:, list(col_map.values())].copy()
-df_data.columns = list(col_map.keys())
+# Read only the mapped columns, already renamed (see rawdata_loader.py)
+df_data = read_columns(file_path, col_map)
 df_data['telegram_date'] = pd.to_datetime(df_data['telegram_date'], errors='coerce')
 
 # ---------------------- Date Filter ----------------------
@@ -64,9 +64,9 @@ df_data = df_data[df_data['total_hrs'] > 0].copy()
 filtered_data = df_data[df_data['total_hrs'] > 10].copy()
 
 # Add calculations
-df_data['actual_speed'] = df_data['miles_slc'] / df_data['total_hrs']
-df_data['slip'] = 1 - ((df_data['actual_speed'] * 1852) / (df_data['engine_rpm'] * df_data['prop_pitch'] * 60))
-df_data['performance_speed'] = (df_data['engine_rpm'] * df_data['prop_pitch'] * 60) / 1852
+df_data['actual_speed'] = actual_speed(df_data['miles_slc'], df_data['total_hrs'], fill=np.nan)
+df_data['slip'] = speed_slip(df_data['actual_speed'], df_data['engine_rpm'], df_data['prop_pitch'], scale=1)
+df_data['performance_speed'] = performance_speed(df_data['engine_rpm'], df_data['prop_pitch'])
 
 df_data['come_cons_delta'] = df_data['come_cons'].shift(1) + df_data['supplied_co'] - df_data['come_cons']
 
@@ -3,10 +3,11 @@ import numpy as np
 import openpyxl
 from openpyxl.chart import BarChart, Reference
 from openpyxl.utils.dataframe import dataframe_to_rows
+from rawdata_loader import read_columns
+from rawdata_propulsion import actual_speed, performance_speed, speed_slip
 
 # ---------------------- Load Excel ----------------------
 file_path = r'C:/Users/Laptop-SatyoYuwono/Downloads/RD-ZS.xlsx'
-df = pd.read_excel(file_path, header=None)
 
 # ---------------------- Column Index Map ----------------------
 col_map = {
@@ -41,9 +42,8 @@ col_map = {
     'ae3_kw': 83
 }
 
-# Extract and rename relevant columns
-df_data = df.iloc[:, list(col_map.values())].copy()
-df_data.columns = list(col_map.keys())
+# Read only the mapped columns, already renamed (see rawdata_loader.py)
+df_data = read_columns(file_path, col_map)
 
 # --- FIX 1: Specify date format for telegram_date ---
 # IMPORTANT: Replace 'YYYY-MM-DD' with the actual format from your Excel file
@@ -91,14 +91,9 @@ df_data = df_data[(df_data['telegram_date'] >= voyage_start_date) & (df_data['te
 df_data = df_data[df_data['total_hrs'] > 0].copy()
 
 # Calculate speeds and slip (these don't rely on previous rows, so fine here)
-df_data['actual_speed'] = df_data['miles_slc'] / df_data['total_hrs']
-# Added .fillna(0) for engine_rpm and prop_pitch in slip calculation if they could be NaN
-df_data['slip'] = df_data.apply(
-    lambda row: 1 - ((row['actual_speed'] * 1852) / (row['engine_rpm'] * row['prop_pitch'] * 60))
-    if row['engine_rpm'] > 0 and row['prop_pitch'] > 0 else np.nan,
-    axis=1
-)
-df_data['performance_speed'] = (df_data['engine_rpm'] * df_data['prop_pitch'] * 60) / 1852
+df_data['actual_speed'] = actual_speed(df_data['miles_slc'], df_data['total_hrs'], fill=np.nan)
+df_data['slip'] = speed_slip(df_data['actual_speed'], df_data['engine_rpm'], df_data['prop_pitch'], scale=1)
+df_data['performance_speed'] = performance_speed(df_data['engine_rpm'], df_data['prop_pitch'])
 
 
 # ---------------------- Weather Speed Loss ----------------------
@@ -1,4 +1,5 @@
 import pandas as pd
+from rawdata_propulsion import actual_speed, engine_distance, slip_percentage
 
 # 1. Load Excel
 file_path = r'C:\Users\Laptop-SatyoYuwono\Downloads\rawdata.xls'
@@ -18,19 +19,13 @@ df['min_to_hrs'] = df['minutes_slc'] / 60
 df['total_hrs'] = df['hours_slc'] + df['min_to_hrs']
 
 # Avoid divide by zero
-df['vessel_speed'] = df.apply(lambda row: row['miles_slc'] / row['total_hrs'] if row['total_hrs'] > 0 else 0, axis=1)
+df['vessel_speed'] = actual_speed(df['miles_slc'], df['total_hrs'])
 
 # Engine distance: RPM * pitch (meters) * total_hrs * 60 (min/hr), convert to NM (1 NM = 1852 m)
-df['engine_distance'] = df.apply(
-    lambda row: (row['engine_rpm'] * row['propeller_pitch'] * row['total_hrs'] * 60) / 1852 if row['total_hrs'] > 0 else 0,
-    axis=1
-)
+df['engine_distance'] = engine_distance(df['engine_rpm'], df['propeller_pitch'], df['total_hrs'])
 
 # Slip percentage
-df['slip_percentage'] = df.apply(
-    lambda row: (1 - row['miles_slc'] / row['engine_distance']) * 100 if row['engine_distance'] > 0 else 0,
-    axis=1
-)
+df['slip_percentage'] = slip_percentage(df['miles_slc'], df['engine_distance'])
 # Filter: only total_hrs > 20
 df = df[df['total_hrs'] > 20]
 
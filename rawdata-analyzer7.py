@@ -2,6 +2,7 @@ import pandas as pd
 import openpyxl
 from openpyxl.chart import BarChart, Reference
 from openpyxl.utils.dataframe import dataframe_to_rows
+from rawdata_propulsion import actual_speed, engine_distance, slip_percentage
 
 # Locating & Load Excel File <-----------------------------
 file_path = r'C:\Users\Laptop-SatyoYuwono\Downloads\Jan-Juli-MF.xls'
@@ -37,15 +38,9 @@ df_calc.columns = [
 # Calculate time and performance
 df_calc['min_to_hrs'] = df_calc['minutes_slc'] / 60
 df_calc['total_hrs'] = df_calc['hours_slc'] + df_calc['min_to_hrs']
-df_calc['vessel_speed'] = df_calc.apply(lambda row: row['miles_slc'] / row['total_hrs'] if row['total_hrs'] > 0 else 0, axis=1)
-df_calc['engine_distance'] = df_calc.apply(
-    lambda row: (row['engine_rpm'] * row['propeller_pitch'] * row['total_hrs'] * 60) / 1852 if row['total_hrs'] > 0 else 0,
-    axis=1
-)
-df_calc['slip_percentage'] = df_calc.apply(
-    lambda row: (1 - row['miles_slc'] / row['engine_distance']) * 100 if row['engine_distance'] > 0 else 0,
-    axis=1
-)
+df_calc['vessel_speed'] = actual_speed(df_calc['miles_slc'], df_calc['total_hrs'])
+df_calc['engine_distance'] = engine_distance(df_calc['engine_rpm'], df_calc['propeller_pitch'], df_calc['total_hrs'])
+df_calc['slip_percentage'] = slip_percentage(df_calc['miles_slc'], df_calc['engine_distance'])
 
 # Filtered and unfiltered data
 df_filtered = df_calc[df_calc['total_hrs'] > 20]
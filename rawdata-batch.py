@@ -0,0 +1,38 @@
+from rawdata_fleet import run_shared_batch
+from rawdata_layouts import load_export
+from rawdata_pipeline import add_daily_metrics, run_batch
+
+# ---------------------- Load Excel ----------------------
+file_path = r'C:/Users/Laptop-SatyoYuwono/Downloads/RD-ZS.xlsx'
+output_dir = r'C:/Users/Laptop-SatyoYuwono/Downloads'
+
+# ---------------------- Voyage Table ----------------------
+# One row per report: vessel code (blank for the whole file), start and end date (inclusive)
+# and the output workbook name. Or point voyage_table at a .csv / .xlsx with the same columns.
+voyage_table = [
+    {'vessel': '', 'start': '2025-01-14', 'end': '2025-03-06', 'output': 'EVR-AA-VOY1.xlsx'},
+    {'vessel': '', 'start': '2025-03-07', 'end': '2025-04-20', 'output': 'EVR-AA-VOY2.xlsx'},
+]
+# voyage_table = r'C:/Users/Laptop-SatyoYuwono/Downloads/voyages.xlsx'
+
+# Worker processes for the reports (0 = one after the other in this process). Workers read
+# the loaded frame from shared memory instead of each holding a copy (see rawdata_shared.py).
+workers = 0
+
+if __name__ == '__main__':
+    # ---------------------- Load & Prepare Once ----------------------
+    # Layout checked first (see rawdata_layouts.py); compact dtypes (col_dtypes) keep
+    # multi-vessel, multi-year exports small in memory
+    df_data = load_export(file_path)
+    df_data = add_daily_metrics(df_data)
+
+    # ---------------------- Reports ----------------------
+    if workers:
+        summary = run_shared_batch(df_data, voyage_table, output_dir, workers)
+        failed = summary[summary['error'] != '']
+        for row in failed.itertuples(index=False):
+            print(f"\n{row.output} failed:\n{row.error}")
+        print(f"Done: {len(summary) - len(failed)}/{len(summary)} voyage reports saved to {output_dir}")
+    else:
+        written = run_batch(df_data, voyage_table, output_dir)
+        print(f"Done: {len(written)} voyage reports saved to {output_dir}")
@@ -0,0 +1,29 @@
+from rawdata_bench import run_benchmarks
+
+# ---------------------- Benchmark Setup ----------------------
+# Synthetic exports and reports go here; timings are appended to results.csv in the same
+# folder (one row per stage, tagged with the git commit) for comparison across commits
+bench_dir = r'C:/Users/Laptop-SatyoYuwono/Downloads/rawdata-bench'
+
+# Rows per synthetic export and its file format. 1M rows is written as .csv:
+# generating (and loading) a 1M-row .xlsx takes far longer than the pipelines themselves.
+sizes = {
+    1_000: 'xlsx',
+    100_000: 'xlsx',
+    1_000_000: 'csv',
+}
+
+pipelines = ('v7', '16-2')
+
+# Per-stage tracemalloc peaks (peak_memory_mb); slows the stages down noticeably, turn
+# off for timing-only runs. Peak RSS (peak_rss_mb) is recorded either way.
+trace_memory = True
+
+# Before timing, check that the compact dtypes (col_dtypes) leave the 16-2 report unchanged
+check_compact = True
+
+if __name__ == '__main__':
+    results = run_benchmarks(bench_dir, sizes, pipelines, trace_memory, check_compact=check_compact)
+    totals = results[results['stage'] == 'total'][['pipeline', 'rows', 'format', 'seconds', 'peak_memory_mb',
+                                                     'peak_rss_mb']]
+    print(totals.to_string(index=False))
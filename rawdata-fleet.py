@@ -0,0 +1,40 @@
+import os
+import time
+
+import pandas as pd
+from rawdata_fleet import jobs_from_dir, jobs_from_manifest, run_fleet
+
+# ---------------------- Fleet Input ----------------------
+# Either a folder holding one raw export per vessel (all run for the same date range),
+# or a manifest .csv / .xlsx with file, start, end and output columns.
+input_dir = r'C:/Users/Laptop-SatyoYuwono/Downloads/fleet'
+manifest_path = None  # e.g. r'C:/Users/Laptop-SatyoYuwono/Downloads/fleet/manifest.xlsx'
+output_dir = r'C:/Users/Laptop-SatyoYuwono/Downloads/fleet-reports'
+
+# Manually input date range <------------------------------ (folder mode only)
+voyage_start_date = pd.to_datetime('2025-01-01')
+voyage_end_date = pd.to_datetime('2025-01-31')
+
+# Worker processes (None = one per CPU core)
+workers = None
+
+if __name__ == '__main__':
+    os.makedirs(output_dir, exist_ok=True)
+    if manifest_path:
+        jobs = jobs_from_manifest(manifest_path, output_dir)
+    else:
+        jobs = jobs_from_dir(input_dir, output_dir, voyage_start_date, voyage_end_date)
+
+    started = time.perf_counter()
+    summary = run_fleet(jobs, workers)
+    wall = time.perf_counter() - started
+
+    # Per-file timing and failures
+    summary_path = os.path.join(output_dir, 'fleet-summary.csv')
+    summary.to_csv(summary_path, index=False)
+    failed = summary[summary['error'] != '']
+    for row in failed.itertuples(index=False):
+        print(f"\n{row.file} failed:\n{row.error}")
+
+    print(f"Done: {len(summary) - len(failed)}/{len(summary)} reports in {wall:.1f}s "
+          f"(serial time {summary['seconds'].sum():.1f}s). Summary: {summary_path}")
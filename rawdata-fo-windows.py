@@ -0,0 +1,27 @@
+import pandas as pd
+from rawdata_fuel import fleet_fo_windows, load_fo_index
+
+# ---------------------- Load Excel ----------------------
+file_path = r'C:\Users\Laptop-SatyoYuwono\Downloads\FZ-JAN-JUN2.xls'
+
+# ---------------------- Date Windows ----------------------
+# Vessel code (blank = every vessel in the export), start and end date (inclusive).
+# Or point windows at a .csv / .xlsx with the same columns.
+windows = [
+    {'vessel': '', 'start': '2025-04-01', 'end': '2025-04-21'},
+    {'vessel': '', 'start': '2025-04-23', 'end': '2025-05-11'},
+]
+# windows = r'C:/Users/Laptop-SatyoYuwono/Downloads/fo-windows.xlsx'
+
+output_path = 'C:/Users/Laptop-SatyoYuwono/Downloads/FO-WINDOWS.xlsx'
+
+# ---------------------- Index & Query ----------------------
+# Built once per export; each window is then a binary search (see rawdata_fuel.py)
+indexes = load_fo_index(file_path)
+
+if isinstance(windows, str):
+    windows = pd.read_csv(windows, dtype={'vessel': str}) if windows.lower().endswith('.csv') else pd.read_excel(windows, dtype={'vessel': str})
+
+summary = fleet_fo_windows(indexes, windows)
+summary.to_excel(output_path, sheet_name='FO Consumption Summary', index=False)
+print(f"Done: FO consumption for {len(summary)} windows saved.")
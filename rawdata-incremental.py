@@ -0,0 +1,28 @@
+import pandas as pd
+from rawdata_incremental import load_derived, update_store
+from rawdata_pipeline import voyage_slice, voyage_metrics, write_report
+
+# ---------------------- Load Excel ----------------------
+file_path = r'C:/Users/Laptop-SatyoYuwono/Downloads/RD-ZS.xlsx'
+
+# Derived dataset for this export; only telegrams appended since the last run are processed
+store_dir = r'C:/Users/Laptop-SatyoYuwono/Downloads/RD-ZS-derived'
+
+# Set to True after telegrams already processed were corrected (or the export was replaced)
+rebuild = False
+
+# Manually input date range <------------------------------
+voyage_start_date = pd.to_datetime('2025-01-14')
+voyage_end_date = pd.to_datetime('2025-03-06')
+
+output_path = 'C:/Users/Laptop-SatyoYuwono/Downloads/EVR-AA-VOY1.xlsx'
+
+# ---------------------- Append New Telegrams ----------------------
+added = update_store(file_path, store_dir, rebuild=rebuild)
+print(f"{added} new telegrams appended to {store_dir}")
+
+# ---------------------- Report ----------------------
+df_data = load_derived(store_dir)
+df_data = voyage_metrics(voyage_slice(df_data, voyage_start_date, voyage_end_date))
+write_report(df_data, output_path)
+print("Done: voyage report saved from the derived dataset.")
@@ -0,0 +1,29 @@
+import os
+
+from rawdata_layouts import load_export
+from rawdata_pipeline import add_daily_metrics, run_batch
+from rawdata_segments import segment_telegrams, voyage_table_from_segments
+
+# ---------------------- Load Excel ----------------------
+file_path = r'C:/Users/Laptop-SatyoYuwono/Downloads/RD-ZS.xlsx'
+output_dir = r'C:/Users/Laptop-SatyoYuwono/Downloads'
+
+# Set to False to only write the segment list (no voyage reports)
+write_reports = True
+
+# ---------------------- Load & Prepare Once ----------------------
+df_data = load_export(file_path)
+df_data = add_daily_metrics(df_data)
+
+# ---------------------- Voyages & Port Stays ----------------------
+# Detected from telegram_type (departure / arrival), see rawdata_segments.py
+df_data, segments = segment_telegrams(df_data)
+segments_path = os.path.join(output_dir, os.path.splitext(os.path.basename(file_path))[0] + '-segments.xlsx')
+segments.to_excel(segments_path, sheet_name='Segments', index=False)
+print(f"{(segments['kind'] == 'voyage').sum()} voyages, {(segments['kind'] == 'port').sum()} port stays -> {segments_path}")
+
+# ---------------------- Reports ----------------------
+# One 16-2 report per detected voyage, same as a hand-written rawdata-batch.py voyage table
+if write_reports:
+    written = run_batch(df_data, voyage_table_from_segments(segments), output_dir)
+    print(f"Done: {len(written)} voyage reports saved to {output_dir}")
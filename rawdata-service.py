@@ -0,0 +1,24 @@
+from rawdata_service import serve
+
+# ---------------------- Report Service ----------------------
+# Serves voyage reports over HTTP on this machine, e.g.
+#   http://127.0.0.1:8016/report?source=fleet&vessel=ABC&start=2024-01-01&end=2024-01-31&report=general,summary
+#   ... &format=xlsx for the workbook, /sources for what is loaded
+# Exports stay in memory; a saved-over export is reloaded on the next request. Stop with Ctrl+C.
+
+# Name used in ?source= -> raw 16-2 export
+sources = {
+    'fleet': r'C:/Users/Laptop-SatyoYuwono/Downloads/16-2.xlsx',
+}
+
+host = '127.0.0.1'   # local only
+port = 8016
+
+# Reports kept in memory (JSON bodies / .xlsx files); least recently used are dropped first
+cache_size = 64
+
+if __name__ == '__main__':
+    try:
+        serve(sources, host, port, cache_size)
+    except KeyboardInterrupt:
+        print("Stopped.")
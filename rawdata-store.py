@@ -0,0 +1,37 @@
+import glob
+import os
+
+import pandas as pd
+from rawdata_pipeline import voyage_metrics, write_report
+from rawdata_store import import_export, open_store, query_telegrams, query_voyage
+
+# ---------------------- Telegram Store ----------------------
+# One SQLite file for all vessels and runs (see rawdata_store.py)
+db_path = r'C:/Users/Laptop-SatyoYuwono/Downloads/telegrams.sqlite'
+
+# Exports to import on this run (empty list = only query what is stored)
+import_files = glob.glob(r'C:/Users/Laptop-SatyoYuwono/Downloads/fleet/*.xlsx')
+
+# ---------------------- Voyage Report ----------------------
+# Vessel code as stored ('' for exports without one)
+vessel = 'ZS'
+voyage_start_date = pd.to_datetime('2025-01-14')
+voyage_end_date = pd.to_datetime('2025-03-06')
+output_path = 'C:/Users/Laptop-SatyoYuwono/Downloads/EVR-AA-VOY1.xlsx'
+
+conn = open_store(db_path)
+for path in import_files:
+    if os.path.basename(path).startswith('~$'):
+        continue
+    print(f"{os.path.basename(path)}: {import_export(conn, path)} telegrams imported")
+
+df_voyage = voyage_metrics(query_voyage(conn, vessel, voyage_start_date, voyage_end_date))
+write_report(df_voyage, output_path)
+print(f"Done: {len(df_voyage)} telegrams from the store saved to {output_path}")
+
+# ---------------------- Cross-File Query ----------------------
+# e.g. every vessel, Q1 2025, slip above 10 %
+high_slip = query_telegrams(conn, start='2025-01-01', end='2025-03-31 23:59:59', where='"Slip (%)" > ?', params=[10],
+                            columns=['vessel_code', 'telegram_date', 'Slip (%)', 'Actual Speed (knots)', 'Engine RPM'])
+print(high_slip.groupby('vessel_code').size().rename('telegrams with slip > 10%').to_string())
+conn.close()
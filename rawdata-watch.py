@@ -0,0 +1,23 @@
+from rawdata_watch import watch
+
+# ---------------------- Watch Folder ----------------------
+# Leave running: raw exports saved into input_dir (new or overwritten) are picked up
+# automatically and only the voyage reports whose telegrams changed are regenerated,
+# into output_dir/<export name>/. Stop with Ctrl+C.
+input_dir = r'C:/Users/Laptop-SatyoYuwono/Downloads'
+output_dir = r'C:/Users/Laptop-SatyoYuwono/Downloads/voyage-reports'
+
+# Voyages are detected from telegram_type (departure / arrival) unless a voyage table
+# (.csv / .xlsx with vessel, start, end, output) is given; it then applies to every export
+voyage_table = None
+
+# Seconds between folder scans, and how long a file must stay unchanged before it is
+# processed (downloads in progress and repeated saves then trigger one run)
+poll_seconds = 5
+debounce_seconds = 30
+
+if __name__ == '__main__':
+    try:
+        watch(input_dir, output_dir, voyage_table, poll_seconds, debounce_seconds)
+    except KeyboardInterrupt:
+        print("Stopped.")
@@ -0,0 +1,352 @@
+import csv
+import os
+import subprocess
+from datetime import datetime
+from itertools import zip_longest
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.chart import BarChart, Reference
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.dataframe import dataframe_to_rows
+
+from rawdata_layouts import LAYOUTS
+from rawdata_loader import parse_telegrams, read_columns, read_raw
+from rawdata_pipeline import col_map, numeric_cols, col_dtypes, add_daily_metrics, voyage_slice, voyage_metrics, write_report
+from rawdata_propulsion import actual_speed, engine_distance, slip_percentage
+from rawdata_timing import finish_run, stage, start_run
+from rawdata_writer import new_workbook
+
+# ---------------------- Synthetic Telegrams ----------------------
+# Raw exports with the same headerless column layout as the real ones, filled with
+# plausible random values, so the pipelines can be timed without vessel data. The v7 and
+# 16-2 layouts come from the layout registry (see rawdata_layouts.py).
+# Rows are generated and written in chunks, and the bad cells stay NaN in the (float)
+# columns until they are written as BAD_CELL_TEXT, so memory does not grow with the row
+# count: the 1M-row export never exists as one frame.
+
+SHEET_WIDTH = 117        # columns in a real export
+BAD_CELL_RATE = 0.001    # share of numeric cells replaced by text, so coercion has work to do
+BAD_CELL_TEXT = 'NIL'    # not one of pandas' default NA strings, so it survives the read
+TELEGRAM_TYPES = ['NOON', 'NOON', 'NOON', 'NOON', 'DEPARTURE', 'ARRIVAL', 'BUNKERING']
+SYNTHETIC_CHUNK_ROWS = 10_000
+
+
+def _field_values(name, n, rng, levels):
+    # Value ranges per col_map field; unknown fields get generic readings. levels carries
+    # the running counters from one chunk to the next.
+    if name == 'vessel_code':
+        return np.full(n, 'SYN', dtype=object)
+    if name == 'telegram_type':
+        return rng.choice(TELEGRAM_TYPES, n)
+    if name in ('fo_rob', 'fw_rob', 'come_cons'):
+        # Remaining on board: drifts down, topped up now and then
+        start = 2000.0 if name == 'fo_rob' else 300.0
+        level = levels.get(name, start) + np.cumsum(rng.normal(0, start / 100, n))
+        levels[name] = level[-1]
+        return np.round(level, 2)
+    if name in ('supplied_fo', 'supplied_co', 'fw_bunk'):
+        return np.where(rng.random(n) < 0.02, np.round(rng.uniform(50, 500, n), 2), 0.0)
+    if name == 'engine_rpm':
+        return np.round(rng.uniform(0, 110, n), 1)
+    if name == 'prop_pitch':
+        return np.round(rng.uniform(4, 7, n), 3)
+    if name == 'miles_slc':
+        return np.round(rng.uniform(0, 400, n), 1)
+    if name == 'hours_slc':
+        return rng.integers(0, 26, n).astype(float)
+    if name == 'minutes_slc':
+        return rng.integers(0, 60, n).astype(float)
+    if name.endswith('_course'):
+        return rng.integers(0, 360, n).astype(float)
+    if name == 'swell_force':
+        # Swell height / current speed, one decimal like the exports: lands on the loss table bin edges
+        return np.round(rng.uniform(0, 6, n), 1)
+    if name == 'current_force':
+        return np.round(rng.uniform(0, 2.5, n), 1)
+    if name.endswith('_force'):
+        return rng.integers(0, 13, n).astype(float)
+    if name.endswith('_kw'):
+        return np.round(rng.uniform(0, 800, n), 1)
+    if name.endswith('_hours'):
+        return np.round(rng.uniform(0, 24, n), 1)
+    return np.round(rng.uniform(0, 30, n), 2)
+
+
+def synthetic_chunks(n_rows, layout=col_map, seed=0, start='2000-01-01', width=SHEET_WIDTH,
+                     bad_cell_rate=BAD_CELL_RATE, chunk_rows=SYNTHETIC_CHUNK_ROWS):
+    # Headerless frames of up to chunk_rows rows: one telegram per hour (1M rows still fit in
+    # the Timestamp range), mapped columns filled per field, the rest with generic readings.
+    # Bad cells are NaN (written as BAD_CELL_TEXT by write_synthetic).
+    rng = np.random.default_rng(seed)
+    levels = {}
+    text_cols = {layout['telegram_date'], layout['telegram_type'], layout.get('vessel_code')}
+    for first in range(0, n_rows, chunk_rows):
+        n = min(chunk_rows, n_rows - first)
+        columns = {i: np.round(rng.uniform(0, 100, n), 2) for i in range(width)}
+        for name, index in layout.items():
+            columns[index] = _field_values(name, n, rng, levels)
+        columns[layout['telegram_date']] = pd.date_range(start, periods=n, freq='h') + pd.Timedelta(first, 'h')
+        for index in range(width):
+            if index not in text_cols:
+                columns[index][rng.random(n) < bad_cell_rate] = np.nan
+        yield pd.DataFrame(columns, columns=range(width))
+
+
+def synthetic_telegrams(n_rows, layout=col_map, seed=0, start='2000-01-01', width=SHEET_WIDTH,
+                        bad_cell_rate=BAD_CELL_RATE):
+    # The whole export as one frame (bad cells NaN); for small sizes
+    return pd.concat(synthetic_chunks(n_rows, layout, seed, start, width, bad_cell_rate), ignore_index=True)
+
+
+def synthetic_path(bench_dir, layout_name, n_rows, file_format):
+    return os.path.join(bench_dir, f"synthetic-{layout_name}-{n_rows}.{file_format}")
+
+
+def write_synthetic(path, n_rows, layout=col_map, seed=0, bad_cell_rate=BAD_CELL_RATE):
+    # Generated once per (layout, rows, format) and reused by later runs. Written chunk by
+    # chunk: .csv appends each chunk, .xlsx streams rows into a write-only workbook.
+    if os.path.exists(path):
+        return path
+    chunks = synthetic_chunks(n_rows, layout, seed, bad_cell_rate=bad_cell_rate)
+    if path.lower().endswith('.csv'):
+        with open(path, 'w', newline='') as f:
+            for chunk in chunks:
+                chunk.to_csv(f, header=False, index=False, na_rep=BAD_CELL_TEXT)
+    else:
+        wb = new_workbook()
+        ws = wb.create_sheet('Sheet1')
+        for chunk in chunks:
+            block = [chunk[col].astype(object).where(chunk[col].notna(), BAD_CELL_TEXT).tolist()
+                     for col in chunk.columns]
+            for row in zip(*block):
+                ws.append(row)
+        wb.save(path)
+    return path
+
+
+# ---------------------- Pipelines Under Test ----------------------
+
+def run_v7(file_path, voyage_start_date, voyage_end_date, output_path):
+    # Same steps as rawdata-analyzer7.py, split into stages
+    with stage('read_excel') as st:
+        df = read_raw(file_path)
+        st['rows'] = len(df)
+    with stage('parse_dates') as st:
+        df[1] = pd.to_datetime(df[1], errors='coerce')
+        st['rows'] = len(df)
+    with stage('voyage_filter') as st:
+        df_voyage = df[(df[1] >= voyage_start_date) & (df[1] <= voyage_end_date)]
+        st['rows'] = len(df_voyage)
+
+    with stage('fo_summary') as st:
+        fo_rob_initial = df_voyage.iloc[0, 4]
+        fo_rob_final = df_voyage.iloc[-1, 4]
+        supplied_fo = df_voyage[34].sum()
+        fo_consumed = fo_rob_initial - fo_rob_final
+        if fo_consumed < 0:
+            fo_consumed += supplied_fo
+        st['rows'] = len(df_voyage)
+
+    with stage('propulsion') as st:
+        columns_needed = [1, 2, 7, 8, 9, 15, 22, 44, 45, 48, 49]
+        df_calc = df_voyage.iloc[:, columns_needed].copy()
+        df_calc.columns = [
+            'date', 'type', 'miles_slc', 'hours_slc', 'minutes_slc',
+            'engine_rpm', 'propeller_pitch', 'me_hsfo_cons', 'me_lsfo_cons',
+            'ae_hsfo_cons', 'ae_lsfo_cons'
+        ]
+        df_calc['min_to_hrs'] = df_calc['minutes_slc'] / 60
+        df_calc['total_hrs'] = df_calc['hours_slc'] + df_calc['min_to_hrs']
+        df_calc['vessel_speed'] = actual_speed(df_calc['miles_slc'], df_calc['total_hrs'])
+        df_calc['engine_distance'] = engine_distance(df_calc['engine_rpm'], df_calc['propeller_pitch'], df_calc['total_hrs'])
+        df_calc['slip_percentage'] = slip_percentage(df_calc['miles_slc'], df_calc['engine_distance'])
+        df_filtered = df_calc[df_calc['total_hrs'] > 20]
+        avg_subset = df_calc[df_calc['total_hrs'] > 10]
+        avg_data = {col: '' for col in df_calc.columns}
+        avg_data['date'] = 'AVERAGE (>10hrs)'
+        for col in ['me_hsfo_cons', 'me_lsfo_cons', 'ae_hsfo_cons', 'ae_lsfo_cons', 'vessel_speed']:
+            avg_data[col] = avg_subset[col].mean()
+        df_unfiltered = pd.concat([df_calc, pd.DataFrame([avg_data])], ignore_index=True)
+        st['rows'] = len(df_calc)
+
+    with stage('write_sheets') as st:
+        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+            df_filtered.to_excel(writer, sheet_name='Filtered Sailing', index=False)
+            df_unfiltered.to_excel(writer, sheet_name='Unfiltered Sailing', index=False)
+            pd.DataFrame({
+                'Description': ['FO ROB Initial', 'FO ROB Final', 'Supplied FO', 'Total FO Consumed'],
+                'Value': [fo_rob_initial, fo_rob_final, supplied_fo, fo_consumed]
+            }).to_excel(writer, sheet_name='FO Consumption Summary', index=False)
+
+            df_chart = avg_subset[['date', 'engine_rpm', 'me_hsfo_cons', 'vessel_speed', 'slip_percentage']].sort_values(by='date')
+            ws = writer.book.create_sheet('Performance Chart')
+            for r in dataframe_to_rows(df_chart, index=False, header=True):
+                ws.append(r)
+            chart = BarChart()
+            chart.add_data(Reference(ws, min_col=2, min_row=1, max_col=5, max_row=len(df_chart) + 1), titles_from_data=True)
+            chart.set_categories(Reference(ws, min_col=1, min_row=2, max_row=len(df_chart) + 1))
+            ws.add_chart(chart, "G2")
+        st['rows'] = len(df_unfiltered)
+
+
+def run_16_2(file_path, voyage_start_date, voyage_end_date, output_path, dtypes=col_dtypes):
+    # rawdata-analyzer16-2.py without the cache / row-window options (plain full read)
+    df_data = parse_telegrams(read_columns(file_path, col_map), numeric_cols, dtypes, source=file_path)
+    df_data = add_daily_metrics(df_data)
+    df_data = voyage_metrics(voyage_slice(df_data, voyage_start_date, voyage_end_date))
+    write_report(df_data, output_path)
+
+
+PIPELINES = {'v7': run_v7, '16-2': run_16_2}
+
+# v7 does no numeric coercion, so its sheets are generated without text cells
+BAD_CELL_RATES = {'v7': 0.0, '16-2': BAD_CELL_RATE}
+
+# Stage name -> the benchmark's comparison groups
+STAGE_GROUPS = {
+    'read_excel': 'load',
+    'scan_dates': 'load',
+    'parse_dates': 'coerce',
+    'sort': 'coerce',
+    'to_numeric': 'coerce',
+    'apply_dtypes': 'coerce',
+    'voyage_filter': 'derive',
+    'fo_summary': 'derive',
+    'daily_metrics': 'derive',
+    'propulsion': 'derive',
+    'weather_loss': 'weather_loss',
+    'quality': 'quality',
+    'summary': 'summary',
+    'write_sheets': 'excel_write',
+    'save_workbook': 'excel_write',
+}
+
+
+# ---------------------- Compact Dtype Check ----------------------
+# col_dtypes must not change a single report cell: the 16-2 report is written from the
+# same export with and without it and the workbooks are compared cell by cell.
+
+def workbook_differences(path_a, path_b, limit=20):
+    # (sheet, cell, value a, value b) for up to limit cells that differ; NaN / empty match
+    wb_a, wb_b = load_workbook(path_a, read_only=True), load_workbook(path_b, read_only=True)
+    differences = []
+    for name in dict.fromkeys(wb_a.sheetnames + wb_b.sheetnames):
+        if name not in wb_a.sheetnames or name not in wb_b.sheetnames:
+            differences.append((name, None, name in wb_a.sheetnames, name in wb_b.sheetnames))
+            continue
+        rows_a = wb_a[name].iter_rows(values_only=True)
+        rows_b = wb_b[name].iter_rows(values_only=True)
+        for r, (row_a, row_b) in enumerate(zip_longest(rows_a, rows_b, fillvalue=()), start=1):
+            for c, (a, b) in enumerate(zip_longest(row_a, row_b), start=1):
+                if a != b and not (pd.isna(a) and pd.isna(b)):
+                    differences.append((name, f"{get_column_letter(c)}{r}", a, b))
+                    if len(differences) >= limit:
+                        return differences
+    return differences
+
+
+def check_compact_dtypes(file_path, output_dir):
+    # Writes the 16-2 report of file_path with and without col_dtypes into output_dir and
+    # raises when any cell differs
+    dates = pd.to_datetime(read_raw(file_path, usecols=[col_map['telegram_date']]).iloc[:, 0], errors='coerce')
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    plain, compact = (os.path.join(output_dir, f"{stem}-{kind}.xlsx") for kind in ('plain', 'compact'))
+    run_16_2(file_path, dates.min(), dates.max(), plain, dtypes=None)
+    run_16_2(file_path, dates.min(), dates.max(), compact, dtypes=col_dtypes)
+    differences = workbook_differences(plain, compact)
+    if differences:
+        listed = '\n'.join(f"  {sheet}!{cell}: {a!r} vs {b!r}" for sheet, cell, a, b in differences)
+        raise ValueError(f"Compact dtypes change the report of {os.path.basename(file_path)}:\n{listed}")
+
+
+# ---------------------- Benchmark Runner ----------------------
+
+RESULT_COLUMNS = ['run_at', 'commit', 'pipeline', 'rows', 'format', 'stage', 'group',
+                  'stage_rows', 'seconds', 'peak_memory_mb', 'peak_rss_mb']
+
+
+def git_commit(repo_dir=None):
+    # Short hash of the checked-out commit, '+' appended when the tree has local changes
+    repo_dir = repo_dir or os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo_dir,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repo_dir,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+    return commit + ('+' if dirty else '')
+
+
+def bench_one(pipeline, file_path, output_path, trace_memory=True):
+    # One timed run over the whole synthetic date range; returns the timing report
+    dates = pd.to_datetime(read_raw(file_path, usecols=[LAYOUTS[pipeline]['telegram_date']]).iloc[:, 0], errors='coerce')
+    start_run(trace_memory=trace_memory, pipeline=pipeline, source=file_path, output=output_path)
+    try:
+        PIPELINES[pipeline](file_path, dates.min(), dates.max(), output_path)
+    finally:
+        report = finish_run(output_path)
+    return report
+
+
+def _or_blank(value):
+    return '' if value is None else value
+
+
+def result_rows(report, n_rows, file_format, commit, run_at):
+    rows = []
+    for record in report['stages']:
+        rows.append({'run_at': run_at, 'commit': commit, 'pipeline': report['pipeline'], 'rows': n_rows,
+                     'format': file_format, 'stage': record['name'], 'group': STAGE_GROUPS.get(record['name'], ''),
+                     'stage_rows': record['rows'], 'seconds': record['seconds'],
+                     'peak_memory_mb': record.get('peak_memory_mb', ''), 'peak_rss_mb': _or_blank(record.get('peak_rss_mb'))})
+    rows.append({'run_at': run_at, 'commit': commit, 'pipeline': report['pipeline'], 'rows': n_rows,
+                 'format': file_format, 'stage': 'total', 'group': 'total', 'stage_rows': n_rows,
+                 'seconds': report['total_seconds'], 'peak_memory_mb': report.get('peak_memory_mb', ''),
+                 'peak_rss_mb': _or_blank(report.get('peak_rss_mb'))})
+    return rows
+
+
+def append_results(results_path, rows):
+    # One CSV for all runs, so timings can be compared across commits. A file written with
+    # fewer columns (before peak_rss_mb) is rewritten with the current ones first.
+    new_file = not os.path.exists(results_path)
+    if not new_file:
+        with open(results_path, newline='') as f:
+            header = next(csv.reader(f), [])
+        if header != RESULT_COLUMNS:
+            pd.read_csv(results_path).reindex(columns=RESULT_COLUMNS).to_csv(results_path, index=False)
+    with open(results_path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def run_benchmarks(bench_dir, sizes, pipelines=('v7', '16-2'), trace_memory=True, seed=0, check_compact=True):
+    # sizes: {rows: 'xlsx' | 'csv'}; results are appended to bench_dir/results.csv.
+    # check_compact: check_compact_dtypes on the smallest 16-2 export first
+    os.makedirs(bench_dir, exist_ok=True)
+    if check_compact and '16-2' in pipelines:
+        n_rows = min(sizes)
+        path = write_synthetic(synthetic_path(bench_dir, '16-2', n_rows, sizes[n_rows]),
+                               n_rows, LAYOUTS['16-2'], seed, BAD_CELL_RATES['16-2'])
+        check_compact_dtypes(path, bench_dir)
+        print(f"Compact dtypes: reports identical ({n_rows} rows)")
+    commit = git_commit()
+    run_at = datetime.now().isoformat(timespec='seconds')
+    results_path = os.path.join(bench_dir, 'results.csv')
+    all_rows = []
+    for n_rows, file_format in sizes.items():
+        for pipeline in pipelines:
+            path = write_synthetic(synthetic_path(bench_dir, pipeline, n_rows, file_format),
+                                   n_rows, LAYOUTS[pipeline], seed, BAD_CELL_RATES[pipeline])
+            output_path = os.path.join(bench_dir, f"report-{pipeline}-{n_rows}.xlsx")
+            report = bench_one(pipeline, path, output_path, trace_memory)
+            rows = result_rows(report, n_rows, file_format, commit, run_at)
+            append_results(results_path, rows)
+            all_rows.extend(rows)
+            print(f"{pipeline} {n_rows} rows ({file_format}): {report['total_seconds']:.2f}s")
+    return pd.DataFrame(all_rows, columns=RESULT_COLUMNS)
@@ -0,0 +1,133 @@
+import glob
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from rawdata_layouts import load_export
+from rawdata_pipeline import add_daily_metrics, read_voyage_table, run_voyage
+from rawdata_shared import attach_frame, publish_frame, release_frame, vessel_window
+
+# ---------------------- Fleet Runner ----------------------
+# One rawdata-analyzer16-2 report per vessel export, spread over a process pool.
+# A job is a dict with file, start, end and output (workbook path).
+
+RAW_EXTENSIONS = ('.xls', '.xlsx', '.csv')
+
+
+def jobs_from_dir(input_dir, output_dir, voyage_start_date, voyage_end_date):
+    # Every raw export in input_dir, same date window for all of them
+    jobs = []
+    for path in sorted(glob.glob(os.path.join(input_dir, '*'))):
+        stem, ext = os.path.splitext(os.path.basename(path))
+        if ext.lower() not in RAW_EXTENSIONS or stem.startswith('~$'):
+            continue
+        output = f"{stem}-{voyage_start_date:%Y%m%d}-{voyage_end_date:%Y%m%d}.xlsx"
+        jobs.append({'file': path, 'start': voyage_start_date, 'end': voyage_end_date,
+                     'output': os.path.join(output_dir, output)})
+    return jobs
+
+
+def jobs_from_manifest(manifest_path, output_dir):
+    # .csv / .xlsx with file, start, end and (optional) output columns
+    if manifest_path.lower().endswith('.csv'):
+        manifest = pd.read_csv(manifest_path)
+    else:
+        manifest = pd.read_excel(manifest_path)
+    jobs = []
+    for row in manifest.to_dict('records'):
+        start, end = pd.to_datetime(row['start']), pd.to_datetime(row['end'])
+        output = row.get('output')
+        if pd.isna(output) or not str(output).strip():
+            stem = os.path.splitext(os.path.basename(row['file']))[0]
+            output = f"{stem}-{start:%Y%m%d}-{end:%Y%m%d}.xlsx"
+        jobs.append({'file': row['file'], 'start': start, 'end': end,
+                     'output': os.path.join(output_dir, str(output))})
+    return jobs
+
+
+def process_file(job):
+    # Runs in a worker process; failures are returned, not raised, so one bad export
+    # does not stop the rest of the fleet
+    started = time.perf_counter()
+    result = {'file': job['file'], 'output': job['output'], 'rows': 0, 'seconds': 0.0, 'error': ''}
+    try:
+        df_data = add_daily_metrics(load_export(job['file']))
+        df_voyage = run_voyage(df_data, job['start'], job['end'], job['output'])
+        result['rows'] = len(df_voyage)
+    except Exception:
+        result['error'] = traceback.format_exc(limit=3).strip()
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def run_fleet(jobs, workers=None):
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_file, job) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            status = 'FAILED' if result['error'] else f"{result['rows']} telegrams"
+            print(f"{os.path.basename(result['file'])}: {status} in {result['seconds']:.2f}s")
+            results.append(result)
+    return pd.DataFrame(results, columns=['file', 'output', 'rows', 'seconds', 'error'])
+
+
+# ---------------------- Shared-Memory Voyage Pool ----------------------
+# run_batch's voyage table (vessel, start, end, output) over a process pool, all voyages
+# cut from one prepared frame. The frame is published once to shared memory (see
+# rawdata_shared.py) and every worker attaches to it when it starts, so more workers do not
+# mean more copies of the data: a worker only copies the rows of the voyage it reports.
+
+_worker = {}
+
+
+def _attach_worker(spec):
+    # Pool initializer; the views stay valid for the life of the worker process
+    df_data, positions, shm = attach_frame(spec)
+    _worker.update(frame=df_data, positions=positions, vessels=spec['vessels'], shm=shm)
+
+
+def process_voyage(job):
+    # Runs in a worker process; failures are returned like in process_file
+    started = time.perf_counter()
+    result = {'vessel': job['vessel'], 'output': job['output'], 'rows': 0, 'seconds': 0.0, 'error': ''}
+    try:
+        rows = vessel_window(_worker['frame'], _worker['positions'], _worker['vessels'],
+                             job['vessel'], job['start'], job['end'])
+        if job['segment'] is not None and 'segment' in rows:
+            # Segment voyages: only the segment's rows, as in run_batch (voyage_rows)
+            rows = rows[rows['segment'].to_numpy() == job['segment']]
+        df_voyage = run_voyage(rows, job['start'], job['end'], job['output'])
+        result['rows'] = len(df_voyage)
+    except Exception:
+        result['error'] = traceback.format_exc(limit=3).strip()
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def run_shared_batch(df_data, voyage_table, output_dir, workers=None):
+    # df_data: parsed export with add_daily_metrics applied, sorted by date (as for run_batch)
+    jobs = [{'vessel': None if pd.isna(voyage.vessel) else str(voyage.vessel), 'start': voyage.start,
+             'end': voyage.end, 'output': os.path.join(output_dir, voyage.output),
+             'segment': None if pd.isna(getattr(voyage, 'segment', None)) else int(voyage.segment)}
+            for voyage in read_voyage_table(voyage_table).itertuples(index=False)]
+    spec, shm = publish_frame(df_data.reset_index(drop=True))
+    for job in [job for job in jobs if job['vessel'] and job['vessel'].strip() not in spec['vessels']]:
+        # Same as run_batch: no empty workbook for a vessel code that is not in the export
+        print(f"Warning: {os.path.basename(job['output'])} skipped, vessel {job['vessel'].strip()} has no telegrams in this export")
+        jobs.remove(job)
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_worker, initargs=(spec,)) as pool:
+            futures = [pool.submit(process_voyage, job) for job in jobs]
+            for future in as_completed(futures):
+                result = future.result()
+                status = 'FAILED' if result['error'] else f"{result['rows']} telegrams"
+                print(f"{os.path.basename(result['output'])}: {status} in {result['seconds']:.2f}s")
+                results.append(result)
+    finally:
+        release_frame(shm)
+    return pd.DataFrame(results, columns=['vessel', 'output', 'rows', 'seconds', 'error'])
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from rawdata_layouts import v7_col_map
+from rawdata_loader import read_columns
+
+# ---------------------- FO Consumption Index ----------------------
+# The FO summary of rawdata-analyzer7 / 9 / 12 (ROB at the first and last telegram of the
+# window, supplied FO summed over it) for any number of date windows. Telegrams are sorted
+# by date once and supplied / daily FO are kept as prefix sums, so every window is two
+# binary searches plus a few subtractions instead of a filter over the whole frame.
+#
+# Within a window the first / last telegram is taken in date order; the scripts take file
+# order, which is the same for date-sorted exports.
+
+FO_DAILY_COLS = ['me_hsfo', 'me_lsfo', 'ae_hsfo', 'ae_lsfo']
+
+# The v7 layout of those scripts (see rawdata_layouts.py), cut down to the FO columns, plus
+# the vessel code in column A for fleet exports
+fo_col_map = {'vessel_code': 0,
+              **{name: v7_col_map[name] for name in ['telegram_date', 'fo_rob', 'supplied_fo'] + FO_DAILY_COLS}}
+
+WINDOW_COLUMNS = ['start', 'end', 'telegrams', 'fo_rob_initial', 'fo_rob_final',
+                  'supplied_fo', 'fo_consumed', 'daily_fo_total']
+
+
+def _prefix_sum(values):
+    # prefix[i] = sum of values[:i]; NaN counts as 0 like Series.sum()
+    return np.concatenate([[0.0], np.cumsum(np.nan_to_num(values, nan=0.0))])
+
+
+def build_fo_index(df_data, daily_cols=FO_DAILY_COLS):
+    # df_data: telegram_date, fo_rob, supplied_fo and daily_cols (one vessel)
+    df = df_data[pd.to_datetime(df_data['telegram_date'], errors='coerce').notna()]
+    df = df.assign(telegram_date=pd.to_datetime(df['telegram_date'])).sort_values('telegram_date', kind='stable')
+
+    def numeric(col):
+        return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+
+    daily = np.nansum(np.column_stack([numeric(col) for col in daily_cols]), axis=1) if daily_cols else np.zeros(len(df))
+    return {
+        'dates': df['telegram_date'].to_numpy(),
+        'fo_rob': numeric('fo_rob'),
+        'supplied_cum': _prefix_sum(numeric('supplied_fo')),
+        'daily_cum': _prefix_sum(daily),
+    }
+
+
+def build_fleet_fo_index(df_data, daily_cols=FO_DAILY_COLS):
+    # One index per vessel_code; the whole frame under '' when there is no vessel column
+    if 'vessel_code' not in df_data:
+        return {'': build_fo_index(df_data, daily_cols)}
+    return {str(code).strip(): build_fo_index(rows, daily_cols)
+            for code, rows in df_data.groupby('vessel_code', sort=False, observed=True)}
+
+
+def load_fo_index(file_path, col_map=fo_col_map, daily_cols=FO_DAILY_COLS):
+    # Reads only the FO columns of the export, one index per vessel
+    return build_fleet_fo_index(read_columns(file_path, col_map), daily_cols)
+
+
+def fo_windows(index, starts, ends):
+    # Consumption for every [start, end] pair (inclusive), vectorized over the windows
+    starts = pd.to_datetime(pd.Series(starts)).to_numpy()
+    ends = pd.to_datetime(pd.Series(ends)).to_numpy()
+    lo = np.searchsorted(index['dates'], starts, side='left')
+    hi = np.searchsorted(index['dates'], ends, side='right')
+    found = hi > lo
+
+    rob = np.append(index['fo_rob'], np.nan)   # padded so empty windows index a NaN
+    initial = np.where(found, rob[np.where(found, lo, -1)], np.nan)
+    final = np.where(found, rob[np.where(found, hi - 1, -1)], np.nan)
+    supplied = index['supplied_cum'][hi] - index['supplied_cum'][lo]
+    consumed = initial - final
+    consumed = np.where(consumed < 0, consumed + supplied, consumed)
+
+    return pd.DataFrame({
+        'start': starts, 'end': ends, 'telegrams': hi - lo,
+        'fo_rob_initial': initial, 'fo_rob_final': final,
+        'supplied_fo': np.where(found, supplied, np.nan), 'fo_consumed': consumed,
+        'daily_fo_total': np.where(found, index['daily_cum'][hi] - index['daily_cum'][lo], np.nan),
+    }, columns=WINDOW_COLUMNS)
+
+
+def fo_window(index, start, end):
+    # Single window as a dict (same keys as the fo_windows columns)
+    return fo_windows(index, [start], [end]).iloc[0].to_dict()
+
+
+def fleet_fo_windows(indexes, windows):
+    # windows: list of dicts / DataFrame with vessel (blank = every vessel), start and end
+    windows = pd.DataFrame(windows)
+    if 'vessel' not in windows:
+        windows['vessel'] = ''
+    windows['vessel'] = windows['vessel'].fillna('').astype(str).str.strip()
+    results = []
+    for vessel, index in indexes.items():
+        rows = windows[(windows['vessel'] == '') | (windows['vessel'] == vessel)]
+        if rows.empty:
+            continue
+        table = fo_windows(index, rows['start'], rows['end'])
+        table.insert(0, 'vessel', vessel)
+        results.append(table)
+    if not results:
+        return pd.DataFrame(columns=['vessel'] + WINDOW_COLUMNS)
+    return pd.concat(results, ignore_index=True)
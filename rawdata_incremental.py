@@ -0,0 +1,152 @@
+import glob
+import json
+import os
+
+import pandas as pd
+
+from rawdata_loader import in_date_order, parse_dates, parse_telegrams, read_columns, read_frame, write_frame
+from rawdata_pipeline import col_map, numeric_cols, add_daily_metrics
+
+# ---------------------- Incremental Append Mode ----------------------
+# Keeps a derived dataset per export in store_dir: state.json holds how many export rows
+# were processed, the date of the last of them (to notice an export that was re-sorted or
+# edited above that row) and the last telegram's fw_rob / come_cons. Every run adds one part
+# file with the rows appended to the export since, whatever their date, so an arrival
+# telegram dated the same day as the last noon report is still picked up. The previous
+# telegram's fw_rob / come_cons seed the shift(1) deltas, so the appended rows match a full
+# recompute. One vessel per export: the lagged deltas are taken over the whole frame
+# (by_vessel=False).
+#
+# A store belongs to one export (by file name). Use rebuild=True after corrections to rows
+# that were already processed, or when a new row is dated before the last processed
+# telegram (its delta can only be taken against that telegram; a warning is printed).
+
+STATE_FILE = 'state.json'
+PART_PREFIX = 'part-'
+
+
+def read_state(store_dir):
+    path = os.path.join(store_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_state(store_dir, state):
+    path = os.path.join(store_dir, STATE_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def _part_bases(store_dir):
+    parts = glob.glob(os.path.join(store_dir, PART_PREFIX + '*'))
+    return sorted({os.path.splitext(p)[0] for p in parts})
+
+
+def clear_store(store_dir):
+    for path in glob.glob(os.path.join(store_dir, PART_PREFIX + '*')) + [os.path.join(store_dir, STATE_FILE)]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _seed_row(state, df_new):
+    # Stand-in for the last processed telegram: only the lagged columns matter. Built from a
+    # new row so the concat keeps every column's dtype.
+    seed = df_new.iloc[:1].copy()
+    seed['telegram_date'] = pd.Timestamp(state['last_date'])
+    seed['fw_rob'] = state['fw_rob']
+    seed['come_cons'] = state['come_cons']
+    return seed
+
+
+def _row_date(raw, source):
+    # Parsed date of the first raw row as stored in the state (ISO string, None for no date)
+    date = parse_dates(raw['telegram_date'].iloc[:1].reset_index(drop=True), source)[0].iloc[0]
+    return None if pd.isna(date) else date.isoformat()
+
+
+def read_new_rows(file_path, state, col_map=col_map, numeric_cols=numeric_cols):
+    # (parsed rows appended since state, rows in the export now, date of its last row)
+    if state is None:
+        raw = read_columns(file_path, col_map)
+        source_rows, last_row_date = len(raw), None
+    else:
+        # Only the rows after the processed ones, plus the last processed row as a check
+        source_rows, last_row_date = state['source_rows'], state['last_row_date']
+        try:
+            raw = read_columns(file_path, col_map, skiprows=source_rows - 1)
+        except (pd.errors.EmptyDataError, KeyError):
+            raw = None   # fewer rows than before
+        if raw is None or raw.empty or _row_date(raw, file_path) != last_row_date:
+            raise ValueError(f"{os.path.basename(str(file_path))} no longer holds the {source_rows} rows processed "
+                             f"before; rerun with rebuild=True")
+        raw = raw.iloc[1:].reset_index(drop=True)
+        source_rows += len(raw)
+    if raw.empty:
+        return raw, source_rows, last_row_date
+    last_row_date = _row_date(raw.iloc[-1:], file_path)
+    df_new = parse_telegrams(raw, numeric_cols, source=file_path)
+    return df_new[df_new['telegram_date'].notna()].reset_index(drop=True), source_rows, last_row_date
+
+
+def update_store(file_path, store_dir, rebuild=False, col_map=col_map, numeric_cols=numeric_cols):
+    # Appends derived rows for the telegrams added to the export since the last run; returns how many
+    os.makedirs(store_dir, exist_ok=True)
+    if rebuild:
+        clear_store(store_dir)
+    state = read_state(store_dir)
+    source = os.path.basename(str(file_path))
+    if state is not None and state.get('source') != source:
+        raise ValueError(f"{store_dir} holds the derived rows of {state.get('source')}, not {source}; "
+                         f"use another store_dir or rebuild=True")
+    if state is not None and 'source_rows' not in state:
+        raise ValueError(f"{store_dir} was written by an older version; rerun with rebuild=True")
+
+    df_new, source_rows, last_row_date = read_new_rows(file_path, state, col_map, numeric_cols)
+    if df_new.empty:
+        if state is not None and source_rows != state['source_rows']:
+            # Only rows without a date were added: skip them next time too
+            write_state(store_dir, dict(state, source_rows=source_rows, last_row_date=last_row_date))
+        return 0
+
+    if state is None:
+        derived = add_daily_metrics(df_new, by_vessel=False)
+        state = {'rows': 0, 'parts': 0}
+    else:
+        if df_new['telegram_date'].iloc[0] < pd.Timestamp(state['last_date']):
+            print(f"Warning: {source} has new telegrams dated before {state['last_date']}; their deltas are taken "
+                  f"against that telegram (rebuild=True recomputes them in date order)")
+        seeded = pd.concat([_seed_row(state, df_new), df_new], ignore_index=True)
+        derived = add_daily_metrics(seeded, by_vessel=False).iloc[1:].reset_index(drop=True)
+
+    part = state['parts'] + 1
+    write_frame(derived, os.path.join(store_dir, f"{PART_PREFIX}{part:05d}"))
+
+    last = derived.iloc[-1]
+    if pd.Timestamp(state.get('last_date', last['telegram_date'])) > last['telegram_date']:
+        last = pd.Series({'telegram_date': pd.Timestamp(state['last_date']),
+                          'fw_rob': state['fw_rob'], 'come_cons': state['come_cons']})
+    write_state(store_dir, {
+        'source': source,
+        'source_rows': source_rows,
+        'last_row_date': last_row_date,
+        'last_date': last['telegram_date'].isoformat(),
+        'fw_rob': float(last['fw_rob']),
+        'come_cons': float(last['come_cons']),
+        'rows': state['rows'] + len(derived),
+        'parts': part,
+    })
+    return len(derived)
+
+
+def load_derived(store_dir):
+    # All parts in date order (late telegrams of an older date are sorted in)
+    frames = [read_frame(base) for base in _part_bases(store_dir)]
+    if not frames:
+        return pd.DataFrame()
+    df_data = pd.concat(frames, ignore_index=True)
+    if not in_date_order(df_data['telegram_date']):
+        df_data = df_data.sort_values(by='telegram_date', kind='stable', ignore_index=True)
+    return df_data
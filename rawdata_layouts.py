@@ -0,0 +1,217 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from rawdata_loader import CACHE_DIR_NAME, file_hash, load_telegrams, parse_dates, read_json, read_raw, write_json
+from rawdata_pipeline import col_map, col_dtypes, numeric_cols
+from rawdata_timing import stage
+
+# ---------------------- Export Layout Registry ----------------------
+# The column indices of the raw exports drift between system versions. Every col_map the
+# analyzers have used is registered here under a name; detect_layout() reads the first
+# rows of an export once and picks the layout whose columns hold the values its fields
+# should hold (dates, text, 0-59 minutes, 0-12 Beaufort ...). The choice is remembered per
+# source file and content hash in the cache folder next to it, so later runs do not sample
+# again until the file changes (an export saved over with another layout is detected anew).
+
+# rawdata-analyzer7.py / 9 / 10 (plus the ROB / supplied FO columns of their FO summary)
+v7_col_map = {
+    'telegram_date': 1,
+    'telegram_type': 2,
+    'fo_rob': 4,
+    'miles_slc': 7,
+    'hours_slc': 8,
+    'minutes_slc': 9,
+    'engine_rpm': 15,
+    'prop_pitch': 22,
+    'supplied_fo': 34,
+    'me_hsfo': 44,
+    'me_lsfo': 45,
+    'ae_hsfo': 48,
+    'ae_lsfo': 49,
+}
+
+# rawdata-analyzer11.py / 12: the v7 layout with the Beaufort column
+v11_col_map = {**v7_col_map, 'wind_force': 11}
+
+# rawdata-analyzer13.py / 14
+v13_col_map = {
+    'vessel_code': 0,
+    'telegram_date': 1,
+    'telegram_type': 2,
+    'me_hsfo': 22,
+    'me_lsfo': 23,
+    'ae_hsfo': 26,
+    'ae_lsfo': 27,
+    'boiler_hsfo': 30,
+    'boiler_lsfo': 31,
+    'fw_rob': 57,
+    'fw_prod': 58,
+    'fw_bunk': 59,
+    'engine_rpm': 66,
+    'prop_pitch': 65,
+    'miles_slc': 116,
+    'hours_slc': 65,
+    'minutes_slc': 66,
+    'wind_course': 84,
+    'wind_force': 85,
+    'swell_course': 90,
+    'swell_force': 91,
+    'current_course': 88,
+    'current_force': 89,
+    'vessel_course': 92,
+    'come_cons': 49,
+    'supplied_co': 54,
+    'ae1_kw': 79,
+    'ae2_kw': 81,
+    'ae3_kw': 83
+}
+
+# Name -> col_map; '16-2' is the layout of rawdata-analyzer15.py onwards (rawdata_pipeline.col_map)
+LAYOUTS = {
+    'v7': v7_col_map,
+    'v11': v11_col_map,
+    'v13': v13_col_map,
+    '16-2': col_map,
+}
+
+# ---------------------- Value-Range Signatures ----------------------
+# 'date' / 'text' or (min, max, whole numbers only) per field; suffix rules cover the
+# force / course / power columns. Fields without a signature are not checked.
+FIELD_SIGNATURES = {
+    'telegram_date': 'date',
+    'telegram_type': 'text',
+    'vessel_code': 'text',
+    'miles_slc': (0, 600, False),
+    'hours_slc': (0, 48, False),
+    'minutes_slc': (0, 59, True),
+    'engine_rpm': (0, 200, False),
+    'prop_pitch': (0, 15, False),
+    'wind_force': (0, 12, True),       # Beaufort
+    'swell_force': (0, 20, False),     # swell height / current speed, not whole numbers
+    'current_force': (0, 10, False),
+}
+SUFFIX_SIGNATURES = {
+    '_course': (0, 360, False),
+    '_kw': (0, 10000, False),
+}
+
+LAYOUT_SAMPLE = 300     # rows read for detection
+MIN_MATCH = 0.9         # share of sampled cells a layout has to explain
+SCORE_TOLERANCE = 0.01  # layouts this close to the best score count as a tie
+LAYOUT_SUFFIX = '.layout.json'
+
+_layouts = {}
+
+
+def field_signature(name):
+    if name in FIELD_SIGNATURES:
+        return FIELD_SIGNATURES[name]
+    for suffix, signature in SUFFIX_SIGNATURES.items():
+        if name.endswith(suffix):
+            return signature
+    return None
+
+
+def _matches(values, signature):
+    # Share of the non-empty cells that fit the signature; None for an all-empty column
+    values = values[values.notna() & (values.astype(str).str.strip() != '')]
+    if values.empty:
+        return None
+    numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    if signature == 'date':
+        fits = parse_dates(values.reset_index(drop=True))[0].notna().to_numpy()
+    elif signature == 'text':
+        fits = np.isnan(numbers) & ~values.map(lambda v: isinstance(v, (pd.Timestamp, np.datetime64))).to_numpy()
+    else:
+        low, high, whole = signature
+        with np.errstate(invalid='ignore'):
+            fits = (numbers >= low) & (numbers <= high)
+            if whole:
+                fits &= numbers == np.round(numbers)
+    return float(fits.mean())
+
+
+def layout_scores(sample, layouts=None):
+    # {name: (share of checked fields' cells that fit, fields checked)} for a headerless sample
+    layouts = LAYOUTS if layouts is None else layouts
+    scores = {}
+    for name, layout in layouts.items():
+        shares = []
+        for field, index in layout.items():
+            signature = field_signature(field)
+            if signature is None:
+                continue
+            share = _matches(sample[index], signature) if index in sample else 0.0
+            if share is not None:
+                shares.append(share)
+        scores[name] = (float(np.mean(shares)) if shares else 0.0, len(shares))
+    return scores
+
+
+def _layout_file(file_path):
+    return os.path.join(os.path.dirname(file_path), CACHE_DIR_NAME, os.path.basename(file_path) + LAYOUT_SUFFIX)
+
+
+def _stored_layout(key, hashed):
+    # Remembered layout of this version of the file, None if there is none
+    entry = read_json(_layout_file(key))
+    if isinstance(entry, dict) and entry.get('file_hash') == hashed:
+        return entry.get('layout')
+    return None
+
+
+def _store_layout(key, hashed, name):
+    write_json(_layout_file(key), {'file_hash': hashed, 'layout': name})
+
+
+def detect_layout(file_path, required=(), layouts=None, refresh=False):
+    # Name of the registered layout matching file_path. Only layouts with every required
+    # field are considered; of (nearly) tied layouts the one checking more fields wins,
+    # e.g. v11 over v7 on an export that has the Beaufort column.
+    layouts = LAYOUTS if layouts is None else layouts
+    candidates = {name: layout for name, layout in layouts.items() if all(field in layout for field in required)}
+    if not candidates:
+        raise ValueError(f"No registered layout has all of {sorted(required)}")
+
+    key = os.path.abspath(str(file_path))
+    hashed = file_hash(key)[:16]
+    if not refresh:
+        if (key, hashed) not in _layouts:
+            _layouts[(key, hashed)] = _stored_layout(key, hashed)
+        if _layouts[(key, hashed)] in candidates:
+            return _layouts[(key, hashed)]
+
+    with stage('detect_layout') as st:
+        sample = read_raw(file_path, nrows=LAYOUT_SAMPLE)
+        scores = layout_scores(sample, candidates)
+        best = max(score for score, _ in scores.values())
+        tied = [n for n, (score, _) in scores.items() if score >= best - SCORE_TOLERANCE]
+        name = max(tied, key=lambda n: (scores[n][1], scores[n][0]))
+        st['rows'] = len(sample)
+        st['layout'] = name
+        st['scores'] = {n: round(score, 3) for n, (score, _) in scores.items()}
+    if scores[name][0] < MIN_MATCH:
+        found = ', '.join(f"{n}: {score:.0%}" for n, (score, _) in scores.items())
+        raise ValueError(f"{os.path.basename(key)} matches no registered layout ({found})")
+
+    _layouts[(key, hashed)] = name
+    _store_layout(key, hashed, name)
+    return name
+
+
+def source_layout(file_path, required=(), layouts=None):
+    # col_map of the detected layout
+    layouts = LAYOUTS if layouts is None else layouts
+    return layouts[detect_layout(file_path, required, layouts)]
+
+
+def load_export(file_path, issues=None):
+    # load_telegrams for the batch, fleet, watch and service paths. Their full metric plan
+    # reads every col_map field, so only a layout with all of them is accepted: an export
+    # in an older layout fails here with its match scores instead of being parsed with the
+    # wrong column indices.
+    layout = source_layout(file_path, required=col_map)
+    return load_telegrams(file_path, layout, [col for col in numeric_cols if col in layout], dtypes=col_dtypes,
+                          issues=issues)
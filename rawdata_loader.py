@@ -0,0 +1,389 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from rawdata_timing import stage
+
+# ---------------------- Column-Projected Ingestion ----------------------
+# The raw telegram exports are 117+ columns wide but the analyzers only use the ~30 in col_map,
+# so only those column indices are handed to the parser.
+
+CSV_EXTENSIONS = ('.csv', '.txt')
+
+
+def read_raw(file_path, usecols=None, **kwargs):
+    # Headerless read of a raw export; columns keep their sheet index as label
+    ext = os.path.splitext(str(file_path))[1].lower()
+    if ext in CSV_EXTENSIONS:
+        return pd.read_csv(file_path, header=None, usecols=usecols, **kwargs)
+    return pd.read_excel(file_path, header=None, usecols=usecols, **kwargs)
+
+
+def read_columns(file_path, col_map, **kwargs):
+    # Same frame as df.iloc[:, list(col_map.values())] renamed to the col_map keys,
+    # without materialising the unmapped columns. Indices may repeat in col_map.
+    with stage('read_excel') as st:
+        raw = read_raw(file_path, usecols=sorted(set(col_map.values())), **kwargs)
+        df_data = raw[list(col_map.values())]
+        df_data.columns = list(col_map.keys())
+        st['rows'] = len(df_data)
+    return df_data
+
+
+# ---------------------- Row-Range Pushdown ----------------------
+# Scan only the telegram date column first, then load the mapped columns for the
+# rows between the first and last telegram of the voyage window.
+
+def find_row_window(file_path, start_date, end_date, date_index=1, lead_in=0, vessel_index=None):
+    with stage('scan_dates') as st:
+        raw = read_raw(file_path, usecols=[date_index] if vessel_index is None else [vessel_index, date_index])
+        # Same date format as the full parse (see source_date_format), so the window matches
+        dates = parse_dates(raw[date_index], source=file_path)[0]
+        st['rows'] = len(dates)
+    in_window = np.flatnonzero(((dates >= start_date) & (dates <= end_date)).to_numpy())
+    if len(in_window) == 0:
+        return None
+    first, last = in_window[0], in_window[-1]
+
+    # Also take the lead_in latest telegrams before the window, so shift(1) deltas
+    # (FW / COME consumption) on the first voyage day still see the previous report. With
+    # vessel_index, per vessel in the window: the deltas are taken per vessel (add_lagged).
+    if lead_in > 0:
+        before = np.flatnonzero((dates < start_date).to_numpy())
+        if len(before):
+            earlier = pd.DataFrame({'date': dates.to_numpy()[before], 'pos': before,
+                                    'vessel': '' if vessel_index is None else
+                                    raw[vessel_index].astype('string').fillna('').str.strip().to_numpy()[before]})
+            if vessel_index is not None:
+                in_window_vessels = raw[vessel_index].astype('string').fillna('').str.strip().iloc[in_window]
+                earlier = earlier[earlier['vessel'].isin(set(in_window_vessels))]
+            latest = earlier.sort_values('date', kind='stable').groupby('vessel', sort=False).tail(lead_in)
+            if len(latest):
+                first = min(first, latest['pos'].min())
+    return int(first), int(last)
+
+
+def read_voyage_window(file_path, col_map, start_date, end_date, lead_in=0):
+    # Rows outside the window can still appear (unsorted exports, lead-in rows);
+    # the caller keeps its own date filter
+    window = find_row_window(file_path, start_date, end_date, col_map['telegram_date'], lead_in,
+                             col_map.get('vessel_code'))
+    if window is None:
+        return pd.DataFrame(columns=list(col_map.keys()))
+    first, last = window
+    return read_columns(file_path, col_map, skiprows=first, nrows=last - first + 1)
+
+
+# ---------------------- Date Format Inference ----------------------
+# Text dates are parsed with one explicit format instead of pandas guessing per call. The
+# format is inferred from a sample of the distinct values and remembered per source file
+# (in memory and in the cache folder next to it); it is re-inferred when it stops fitting.
+# Cells Excel already stored as dates are taken as they are.
+#
+# The candidate parsing most of the sample wins, the earlier one in DATE_FORMATS on a
+# tie. Month-first comes before day-first, as in pd.to_datetime: a sample whose days are
+# all 12 or less (01/02/2025) is read month-first like before, and day-first is only
+# chosen when the sample has a day above 12 that month-first cannot parse.
+
+DATE_FORMATS = [
+    '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y/%m/%d', '%Y/%m/%d %H:%M:%S', '%Y/%m/%d %H:%M',
+    '%m/%d/%Y', '%m/%d/%Y %H:%M', '%d/%m/%Y', '%d/%m/%Y %H:%M', '%m-%d-%Y', '%d-%m-%Y', '%m.%d.%Y', '%d.%m.%Y',
+    '%Y%m%d', '%d-%b-%Y', '%d %b %Y', '%d-%b-%y',
+]
+DATE_SAMPLE = 500
+DATE_FORMAT_SUFFIX = '.date-format-2.json'   # -2: month-first precedence, day-first choices of older runs are not reused
+
+_date_formats = {}
+_date_formats_lock = threading.Lock()
+
+
+def _date_sample(text):
+    return pd.Series(pd.unique(text.str.strip())[:DATE_SAMPLE], dtype=object)
+
+
+def _format_hits(sample, fmt):
+    return int(pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum())
+
+
+def infer_date_format(text, formats=DATE_FORMATS):
+    # Candidate parsing most of the sample; None when none of them parses anything
+    sample = _date_sample(text)
+    best, best_hits = None, 0
+    for fmt in formats:
+        hits = _format_hits(sample, fmt)
+        if hits > best_hits:
+            best, best_hits = fmt, hits
+        if hits == len(sample):
+            break
+    return best
+
+
+def read_json(path):
+    # Contents of a small state file; None when it is missing or unreadable (e.g. half written)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, data):
+    # Written to a temporary file first, so concurrent readers never see a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _format_file(file_path):
+    # One file per source, so fleet workers on different exports never rewrite each other's entry
+    return os.path.join(os.path.dirname(file_path), CACHE_DIR_NAME, os.path.basename(file_path) + DATE_FORMAT_SUFFIX)
+
+
+def source_date_format(file_path, text):
+    # Remembered format of file_path when it still parses (nearly) all of the sample,
+    # otherwise a fresh inference that is stored for the next run
+    key = os.path.abspath(str(file_path))
+    with _date_formats_lock:
+        if key not in _date_formats:
+            stored = read_json(_format_file(key))
+            _date_formats[key] = stored.get('format') if isinstance(stored, dict) else None
+        fmt = _date_formats[key]
+    sample = _date_sample(text)
+    if fmt is not None and _format_hits(sample, fmt) >= 0.9 * len(sample):
+        return fmt
+
+    fmt = infer_date_format(text)
+    with _date_formats_lock:
+        _date_formats[key] = fmt
+    write_json(_format_file(key), {'format': fmt})
+    return fmt
+
+
+def parse_dates(values, source=None):
+    # (datetime Series, cells that could not be parsed, text format used)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values, 0, None
+    if pd.api.types.is_string_dtype(values) and values.dtype != object:
+        is_text = values.notna().to_numpy()
+    else:
+        is_text = values.map(type).eq(str).to_numpy()
+    text = values[is_text].astype(str)
+    fmt = None
+    if len(text):
+        fmt = source_date_format(source, text) if source is not None else infer_date_format(text)
+
+    if is_text.all():
+        dates = pd.to_datetime(values, format=fmt, errors='coerce')
+    else:
+        dates = pd.to_datetime(values.where(~is_text), errors='coerce')
+        if len(text):
+            dates[is_text] = pd.to_datetime(text, format=fmt, errors='coerce')
+    blank = np.zeros(len(values), dtype=bool)
+    blank[is_text] = (text.str.strip() == '').to_numpy()
+    unparseable = int((values.notna().to_numpy() & ~blank & dates.isna().to_numpy()).sum())
+    return dates, unparseable, fmt
+
+
+# ---------------------- Block Numeric Conversion ----------------------
+
+def to_numeric_block(df_data, cols, fill_value=np.nan):
+    # All numeric columns in one conversion: numeric-typed columns are cast together, the
+    # rest are flattened into one array and factorized, so to_numeric (and the blank check)
+    # only runs on the distinct cell values - readings repeat a lot. Returns the float
+    # block and the unparseable (non-empty, non-numeric) cell counts per column and per row.
+    # Empty and unparseable cells get fill_value; the block is wrapped without a copy.
+    block = df_data[cols]
+    numeric = np.array([pd.api.types.is_numeric_dtype(t) and not pd.api.types.is_bool_dtype(t) for t in block.dtypes])
+    values = None
+    bad = np.zeros(len(cols), dtype=np.int64)
+    bad_rows = np.zeros(len(block), dtype=np.int64)
+    if numeric.any():
+        values = np.empty((len(block), len(cols)), dtype=float)
+        values[:, numeric] = block.loc[:, numeric].to_numpy(dtype=float, na_value=fill_value)
+    if not numeric.all():
+        raw = block.loc[:, ~numeric].to_numpy(dtype=object)
+        shape = raw.shape
+        codes, uniques = pd.factorize(raw.ravel())   # missing cells get code -1
+        del raw
+        uniques = pd.Series(uniques, dtype=object)
+        parsed = pd.to_numeric(uniques, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        # Blank text cells count as empty, not as unparseable
+        failed = np.isnan(parsed) & (uniques.astype(str).str.strip() != '').to_numpy()
+        table = np.append(np.where(np.isnan(parsed), fill_value, parsed), fill_value)
+        converted = table[codes].reshape(shape)
+        failed_cells = np.append(failed, False)[codes].reshape(shape)
+        del codes
+        if values is None:
+            values = converted
+        else:
+            values[:, ~numeric] = converted
+        bad[~numeric] = failed_cells.sum(axis=0)
+        bad_rows = failed_cells.sum(axis=1)
+    return pd.DataFrame(values, index=df_data.index, columns=cols, copy=False), dict(zip(cols, bad.tolist())), bad_rows
+
+
+# ---------------------- Typed Telegram Frame ----------------------
+
+def in_date_order(dates):
+    # Ascending with any NaT at the end, i.e. already in sort_values order
+    n_valid = int(dates.notna().sum())
+    return bool(dates.iloc[n_valid:].isna().all() and dates.iloc[:n_valid].is_monotonic_increasing)
+
+
+def parse_telegrams(df_data, numeric_cols, dtypes=None, source=None, issues=None):
+    # Date parsing, date sort and numeric coercion as done by rawdata-analyzer16-2,
+    # then the compact dtypes when given (see col_dtypes in rawdata_pipeline.py).
+    # source: the export path, so its date format is inferred once and remembered.
+    # Unparseable cells still end up NaT / 0, but are counted per column into issues
+    # (when a dict is passed) and into the timing report, and per row in unparseable_cells
+    # (see rawdata_quality.py).
+    with stage('parse_dates') as st:
+        df_data['telegram_date'], bad_dates, st['date_format'] = parse_dates(df_data['telegram_date'], source)
+        st['rows'] = len(df_data)
+        st['unparseable'] = bad_dates
+    with stage('sort') as st:
+        # Exports are mostly in date order already; only then is the reorder (a full copy) skipped
+        if not in_date_order(df_data['telegram_date']):
+            df_data = df_data.sort_values(by='telegram_date')
+        df_data = df_data.reset_index(drop=True)
+        st['rows'] = len(df_data)
+    with stage('to_numeric') as st:
+        cols = list(dict.fromkeys(numeric_cols))
+        if cols:
+            values, bad_cells, bad_rows = to_numeric_block(df_data, cols, fill_value=0)
+            df_data[cols] = values
+        else:
+            bad_cells, bad_rows = {}, 0
+        df_data['unparseable_cells'] = np.asarray(bad_rows, dtype=np.int16)
+        st['rows'] = len(df_data)
+        st['unparseable'] = {col: n for col, n in bad_cells.items() if n}
+    if issues is not None:
+        counts = dict(telegram_date=bad_dates, **bad_cells)
+        issues.update({col: n for col, n in counts.items() if n})
+    if dtypes:
+        df_data = apply_dtypes(df_data, dtypes)
+    return df_data
+
+
+def _compact(values, dtype):
+    if dtype == 'category':
+        return values.astype('category')
+    dtype = np.dtype(dtype)
+    if dtype.kind in 'iu':
+        # Stays float64 for fractions, NaN or values outside the integer range
+        arr = values.to_numpy(dtype=float, na_value=np.nan)
+        info = np.iinfo(dtype)
+        if not (np.isfinite(arr).all() and (arr == np.round(arr)).all()
+                and (arr >= info.min).all() and (arr <= info.max).all()):
+            return values.astype(float)
+    return values.astype(dtype)
+
+
+def apply_dtypes(df_data, dtypes):
+    # Columns missing from df_data are skipped
+    with stage('apply_dtypes') as st:
+        for col, dtype in dtypes.items():
+            if col in df_data:
+                df_data[col] = _compact(df_data[col], dtype)
+        st['rows'] = len(df_data)
+    return df_data
+
+
+# ---------------------- Parsed Workbook Cache ----------------------
+# The typed frame of a whole export is stored next to it, keyed by the file content hash
+# plus the col_map / numeric_cols in use. Editing or replacing the export changes the
+# hash, so stale entries are never read and get removed on the next write. The dtypes
+# are part of the key too; entries for other col_maps of the same file version are kept.
+# The unparseable-cell counts of the parse are stored next to each entry.
+
+CACHE_VERSION = 3
+CACHE_DIR_NAME = '.rawdata-cache'
+
+
+def file_hash(file_path, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(file_path, col_map, numeric_cols, dtypes=None):
+    layout = json.dumps([CACHE_VERSION, list(col_map.items()), list(numeric_cols), sorted((dtypes or {}).items())])
+    return file_hash(file_path)[:16] + '-' + hashlib.sha1(layout.encode()).hexdigest()[:8]
+
+
+def _cache_files(cache_dir, file_path):
+    # {path: file hash part of the key} of the cache entries of file_path
+    pattern = re.compile(re.escape(os.path.basename(str(file_path))) + r'-([0-9a-f]{16})-[0-9a-f]{8}\.(parquet|pkl|json)$')
+    if not os.path.isdir(cache_dir):
+        return {}
+    matches = {f: pattern.match(f) for f in os.listdir(cache_dir)}
+    return {os.path.join(cache_dir, f): m.group(1) for f, m in matches.items() if m}
+
+
+def write_frame(df_data, base):
+    # Parquet when pyarrow is installed and the columns allow it, pickle otherwise
+    try:
+        df_data.to_parquet(base + '.parquet', index=False)
+        return base + '.parquet'
+    except (ImportError, ValueError, TypeError):
+        if os.path.exists(base + '.parquet'):
+            os.remove(base + '.parquet')
+        df_data.to_pickle(base + '.pkl')
+        return base + '.pkl'
+
+
+def read_frame(base):
+    # Counterpart of write_frame; None when nothing was written under base
+    if os.path.exists(base + '.parquet'):
+        return pd.read_parquet(base + '.parquet')
+    if os.path.exists(base + '.pkl'):
+        return pd.read_pickle(base + '.pkl')
+    return None
+
+
+def load_telegrams(file_path, col_map, numeric_cols, cache_dir=None, dtypes=None, issues=None):
+    # issues: as for parse_telegrams; the counts are stored with the cache entry
+    # (<entry>.json), so a cached load reports the same unparseable cells as the first one
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(file_path)), CACHE_DIR_NAME)
+    key = cache_key(file_path, col_map, numeric_cols, dtypes)
+    base = os.path.join(cache_dir, os.path.basename(str(file_path)) + '-' + key)
+
+    with stage('cache_read') as st:
+        df_data = read_frame(base)
+        st['rows'] = None if df_data is None else len(df_data)
+        if df_data is not None and os.path.exists(base + '.json'):
+            with open(base + '.json') as f:
+                counts = json.load(f)
+            st['unparseable'] = counts
+            if issues is not None:
+                issues.update(counts)
+    if df_data is not None:
+        return df_data
+
+    counts = {}
+    df_data = parse_telegrams(read_columns(file_path, col_map), numeric_cols, dtypes, source=file_path, issues=counts)
+    if issues is not None:
+        issues.update(counts)
+
+    with stage('cache_write') as st:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Entries of older versions of the file go; other projections (col_map / dtypes) of
+        # this version stay, so alternating sheet selections do not evict each other
+        for stale, hashed in _cache_files(cache_dir, file_path).items():
+            if hashed != key.split('-')[0]:
+                os.remove(stale)
+        write_frame(df_data, base)
+        with open(base + '.json', 'w') as f:
+            json.dump(counts, f, indent=2)
+        st['rows'] = len(df_data)
+    return df_data
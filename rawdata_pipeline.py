@@ -0,0 +1,383 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from rawdata_timing import stage
+from rawdata_propulsion import actual_speed, performance_speed, speed_slip
+from rawdata_quality import REPORT_DROP, VOYAGE_DROP, quality_counts, quality_flags, rows_without, without_flags
+from rawdata_summary import summary_table
+from rawdata_weather import current_speed_loss, speed_loss, swell_speed_loss, wind_speed_loss
+from rawdata_writer import add_bar_chart, append_table, new_workbook
+
+# ---------------------- rawdata-analyzer16-2 Pipeline ----------------------
+# The 16-2 report split into stages so one loaded export can be reused for several
+# voyages (rawdata-batch.py) instead of re-running the whole script per voyage.
+
+# ---------------------- Column Index Map ----------------------
+col_map = {
+    'vessel_code': 0,
+    'telegram_date': 1,
+    'telegram_type': 2,
+    'me_hsfo': 22,
+    'me_lsfo': 23,
+    'ae_hsfo': 26,
+    'ae_lsfo': 27,
+    'boiler_hsfo': 30,
+    'boiler_lsfo': 31,
+    'fw_rob': 57,
+    'fw_prod': 58,
+    'fw_bunk': 59,
+    'engine_rpm': 66,
+    'prop_pitch': 65,
+    'miles_slc': 62,
+    'hours_slc': 63,
+    'minutes_slc': 64,
+    'wind_course': 84,
+    'wind_force': 85,
+    'swell_course': 90,
+    'swell_force': 91,
+    'current_course': 88,
+    'current_force': 89,
+    'vessel_course': 92,
+    'come_cons': 49,
+    'supplied_co': 54,
+    'ae1_hours': 80,
+    'ae1_kw': 79,
+    'ae2_hours': 82,
+    'ae2_kw': 81,
+    'ae3_hours': 84,
+    'ae3_kw': 83
+}
+
+# ---------------------- Numeric Columns ----------------------
+numeric_cols = [
+    'me_hsfo', 'me_lsfo', 'ae_hsfo', 'ae_lsfo', 'boiler_hsfo', 'boiler_lsfo',
+    'fw_rob', 'fw_prod', 'fw_bunk',
+    'engine_rpm', 'prop_pitch', 'miles_slc', 'hours_slc', 'minutes_slc',
+    'come_cons', 'supplied_co', 'ae1_kw', 'ae2_kw', 'ae3_kw',
+    'wind_force', 'vessel_course', 'wind_course', 'swell_force', 'swell_course', 'current_force', 'current_course'
+]
+
+# ---------------------- Column Dtypes ----------------------
+# Compact storage applied at ingest (parse_telegrams / load_telegrams with dtypes=col_dtypes):
+# categoricals for the text columns and small integers for the whole-number readings, so
+# the values themselves never change. The other readings stay float64: they are operands
+# of the derived metrics and float32 would shift them (0.2 -> 0.200000003 crosses the
+# current force bin edge; FW / speed columns pick up the noise). An integer dtype only
+# holds when a column is whole numbers in range, float64 is kept otherwise.
+col_dtypes = {
+    'vessel_code': 'category',
+    'telegram_type': 'category',
+    'wind_force': 'int8',           # Beaufort 0-12
+    'hours_slc': 'int8',
+    'minutes_slc': 'int8',
+    'vessel_course': 'int16',       # degrees
+    'wind_course': 'int16',
+    'swell_course': 'int16',
+    'current_course': 'int16',
+}
+
+
+# ---------------------- Derived Metrics ----------------------
+# Every derived column as (stage, input columns, compute), in dependency order. Inputs are
+# col_map fields or other derived columns, so the metrics (and raw columns) behind any set
+# of outputs can be resolved without computing the rest.
+# daily_metrics run on the full date-sorted frame before the voyage filter (FW and COME
+# consumption use the previous telegram); propulsion and weather_loss on the voyage rows.
+# lag metrics are the previous telegram's value of one column, all shifted together (per
+# vessel, see add_lagged).
+derived_metrics = {
+    'prev_fw_rob': ('lag', ['fw_rob'], None),
+    'prev_come_cons': ('lag', ['come_cons'], None),
+
+    'Daily FO Consumption (kL)': ('daily_metrics', ['me_hsfo', 'me_lsfo', 'ae_hsfo', 'ae_lsfo', 'boiler_hsfo', 'boiler_lsfo'],
+                                  lambda d: d[['me_hsfo', 'me_lsfo', 'ae_hsfo', 'ae_lsfo', 'boiler_hsfo', 'boiler_lsfo']].sum(axis=1)),
+    'Daily FW Consumption (kL)': ('daily_metrics', ['prev_fw_rob', 'fw_rob', 'fw_bunk', 'fw_prod'],
+                                  lambda d: d['prev_fw_rob'] + d['fw_bunk'] + d['fw_prod'] - d['fw_rob']),
+    'Daily FW Production (kL)': ('daily_metrics', ['fw_prod'], lambda d: d['fw_prod']),
+    'Engine RPM': ('daily_metrics', ['engine_rpm'], lambda d: d['engine_rpm']),
+    'ME FO Consumption (kL)': ('daily_metrics', ['me_hsfo', 'me_lsfo'], lambda d: d['me_hsfo'] + d['me_lsfo']),
+    'total_hrs': ('daily_metrics', ['hours_slc', 'minutes_slc'], lambda d: d['hours_slc'] + (d['minutes_slc'] / 60)),
+    'AE 1 Power (kW)': ('daily_metrics', ['ae1_kw'], lambda d: d['ae1_kw']),
+    'AE 2 Power (kW)': ('daily_metrics', ['ae2_kw'], lambda d: d['ae2_kw']),
+    'AE 3 Power (kW)': ('daily_metrics', ['ae3_kw'], lambda d: d['ae3_kw']),
+    'AE 1 Hours': ('daily_metrics', ['ae1_hours'], lambda d: d['ae1_hours']),
+    'AE 2 Hours': ('daily_metrics', ['ae2_hours'], lambda d: d['ae2_hours']),
+    'AE 3 Hours': ('daily_metrics', ['ae3_hours'], lambda d: d['ae3_hours']),
+    'COME Consumption (L)': ('daily_metrics', ['prev_come_cons', 'come_cons', 'supplied_co'],
+                             lambda d: (d['prev_come_cons'].fillna(0) - d['come_cons'].fillna(0)) + d['supplied_co'].fillna(0)),
+    'Boiler FO Consumption (kL)': ('daily_metrics', ['boiler_hsfo', 'boiler_lsfo'], lambda d: d['boiler_hsfo'] + d['boiler_lsfo']),
+    'AE FO Consumption (kL)': ('daily_metrics', ['ae_hsfo', 'ae_lsfo'], lambda d: d['ae_hsfo'] + d['ae_lsfo']),
+
+    # Speeds and slip don't rely on previous rows; see rawdata_propulsion.py
+    'Actual Speed (knots)': ('propulsion', ['miles_slc', 'total_hrs'],
+                             lambda d: actual_speed(d['miles_slc'], d['total_hrs'], fill=np.nan)),
+    'Slip (%)': ('propulsion', ['Actual Speed (knots)', 'engine_rpm', 'prop_pitch'],
+                 lambda d: speed_slip(d['Actual Speed (knots)'], d['engine_rpm'], d['prop_pitch'])),
+    'Performance Speed (knots)': ('propulsion', ['engine_rpm', 'prop_pitch'],
+                                  lambda d: performance_speed(d['engine_rpm'], d['prop_pitch'])),
+
+    # Whole-column weather loss, see rawdata_weather.py
+    'Speed Loss by Wind (knots)': ('weather_loss', ['wind_force', 'wind_course', 'vessel_course', 'Performance Speed (knots)'],
+                                   lambda d: speed_loss(d, 'wind_force', 'wind_course', wind_speed_loss)),
+    'Speed Loss by Swell (knots)': ('weather_loss', ['swell_force', 'swell_course', 'vessel_course', 'Performance Speed (knots)'],
+                                    lambda d: speed_loss(d, 'swell_force', 'swell_course', swell_speed_loss)),
+    'Speed Loss by Current (knots)': ('weather_loss', ['current_force', 'current_course', 'vessel_course', 'Performance Speed (knots)'],
+                                      lambda d: speed_loss(d, 'current_force', 'current_course', current_speed_loss)),
+}
+
+# Needed by the voyage (total_hrs > 0) and report (total_hrs > 10) filters whatever is requested
+BASE_METRICS = ['total_hrs']
+
+
+def metric_plan(outputs=None):
+    # Derived metrics behind outputs (metric names or raw fields) in dependency order; all when None
+    if outputs is None:
+        return list(derived_metrics)
+    needed = set()
+    pending = list(outputs) + BASE_METRICS
+    while pending:
+        name = pending.pop()
+        if name in derived_metrics and name not in needed:
+            needed.add(name)
+            pending.extend(derived_metrics[name][1])
+    return [name for name in derived_metrics if name in needed]
+
+
+def plan_inputs(metrics, outputs=(), layout=None):
+    # col_map (or another export layout, see rawdata_layouts.py) / numeric_cols cut down to
+    # the raw fields the metrics (and outputs) read; vessel_code is kept for the per-vessel
+    # lagged deltas
+    layout = col_map if layout is None else layout
+    fields = {'telegram_date', 'vessel_code'} | set(outputs) | {col for name in metrics for col in derived_metrics[name][1]}
+    load_map = {name: index for name, index in layout.items() if name in fields}
+    return load_map, [col for col in numeric_cols if col in load_map]
+
+
+def compute_metrics(df_data, metrics, stage_name):
+    for name in metrics:
+        metric_stage, _, compute = derived_metrics[name]
+        if metric_stage == stage_name:
+            df_data[name] = compute(df_data)
+    return df_data
+
+
+# ---------------------- Calculations ----------------------
+def add_lagged(df_data, metrics, by_vessel=None):
+    # Previous telegram's value for every lag metric in one shift. With by_vessel (default:
+    # whenever there is a vessel_code column) the shift runs per vessel_code group, so a
+    # multi-vessel export never takes a delta against another vessel's telegram. The frame
+    # stays sorted by date: each vessel's rows are then in date order already, and
+    # voyage_slice can keep using a binary search on the whole frame.
+    lagged = [name for name in metrics if derived_metrics[name][0] == 'lag']
+    if not lagged:
+        return df_data
+    sources = [derived_metrics[name][1][0] for name in lagged]
+    if by_vessel is None:
+        by_vessel = 'vessel_code' in df_data
+    if by_vessel:
+        shifted = df_data[sources].groupby(df_data['vessel_code'], sort=False, observed=True, dropna=False).shift(1)
+    else:
+        shifted = df_data[sources].shift(1)
+    for name, source in zip(lagged, sources):
+        df_data[name] = shifted[source]
+    return df_data
+
+
+def add_daily_metrics(df_data, metrics=None, by_vessel=None):
+    # Needs the full date-sorted frame: FW and COME consumption use the previous telegram
+    metrics = metric_plan() if metrics is None else metrics
+    with stage('daily_metrics') as st:
+        add_lagged(df_data, metrics, by_vessel)
+        compute_metrics(df_data, metrics, 'daily_metrics')
+        st['rows'] = len(df_data)
+    return df_data
+
+
+# ---------------------- Date Filter ----------------------
+def voyage_slice(df_data, voyage_start_date, voyage_end_date):
+    # df_data is sorted by telegram_date (NaT last), so the inclusive window is found by
+    # binary search instead of a full boolean mask
+    with stage('voyage_filter') as st:
+        dates = df_data['telegram_date'].to_numpy()
+        lo = np.searchsorted(dates, np.datetime64(voyage_start_date), side='left')
+        hi = np.searchsorted(dates, np.datetime64(voyage_end_date), side='right')
+        st['rows'] = int(hi - lo)
+    return df_data.iloc[lo:hi]
+
+
+def voyage_metrics(df_voyage, metrics=None, keep_flagged=False):
+    # Speeds, slip and weather loss, then the quality bitmask (see rawdata_quality.py).
+    # Rows without positive total_hrs are dropped unless keep_flagged (for write_quality);
+    # write_report leaves them out either way.
+    # The metrics go on a shallow copy: the telegram columns stay shared with the loaded
+    # frame (copy-on-write), only the new metric columns take memory.
+    metrics = metric_plan() if metrics is None else metrics
+    with stage('propulsion') as st:
+        df_voyage = df_voyage.copy(deep=False)
+        compute_metrics(df_voyage, metrics, 'propulsion')
+        st['rows'] = len(df_voyage)
+
+    with stage('weather_loss') as st:
+        compute_metrics(df_voyage, metrics, 'weather_loss')
+        st['rows'] = len(df_voyage)
+
+    with stage('quality') as st:
+        df_voyage['quality'] = quality_flags(df_voyage)
+        st['rows'] = len(df_voyage)
+        st['flags'] = {name: n for name, n in quality_counts(df_voyage['quality']).items() if n}
+        if not keep_flagged:
+            df_voyage = without_flags(df_voyage, VOYAGE_DROP)
+    return df_voyage
+
+
+# ---------------------- Save to Excel ----------------------
+# Written through the streaming writer (see rawdata_writer.py)
+
+general_columns = ['Daily FO Consumption (kL)', 'Daily FW Consumption (kL)', 'Daily FW Production (kL)', 'Performance Speed (knots)', 'Actual Speed (knots)']
+speed_loss_columns = ['Speed Loss by Current (knots)', 'Speed Loss by Swell (knots)', 'Speed Loss by Wind (knots)']
+main_engine_columns = ['Engine RPM', 'Slip (%)', 'ME FO Consumption (kL)', 'COME Consumption (L)']
+aux_columns = ['Boiler FO Consumption (kL)', 'AE FO Consumption (kL)', 'AE 1 Power (kW)', 'AE 2 Power (kW)', 'AE 3 Power (kW)']
+
+# Summary sheet: means of every report column and totals of the consumption columns, by
+# sailing-hours threshold, wind force band and telegram type (see rawdata_summary.py)
+summary_columns = general_columns + speed_loss_columns + main_engine_columns + aux_columns
+summary_total_columns = ['Daily FO Consumption (kL)', 'Daily FW Consumption (kL)', 'Daily FW Production (kL)',
+                         'ME FO Consumption (kL)', 'COME Consumption (L)', 'Boiler FO Consumption (kL)', 'AE FO Consumption (kL)']
+
+# Sheet name -> columns it shows or groups by (dates come along on every sheet); raw
+# fields listed here are loaded through plan_inputs(metrics, report_outputs(sheets))
+report_sheets = {
+    'General Data': general_columns + speed_loss_columns,
+    'Main Engine Data': main_engine_columns,
+    'Aux. Engine & Boiler Data': aux_columns,
+    'Summary': summary_columns + ['wind_force', 'telegram_type'],
+}
+
+
+def report_outputs(sheets=None):
+    # Columns behind the requested sheets (all sheets when None), for metric_plan()
+    sheets = list(report_sheets) if sheets is None else sheets
+    return [col for sheet in sheets for col in report_sheets[sheet]]
+
+
+def write_report(df_voyage, output_path, sheets=None):
+    sheets = list(report_sheets) if sheets is None else sheets
+    if 'Summary' in sheets:
+        with stage('summary') as st:
+            # All voyage rows: the hours thresholds replace the total_hrs > 10 filter
+            df_summary = summary_table(df_voyage, summary_columns, summary_total_columns)
+            st['rows'] = len(df_voyage)
+
+    with stage('write_sheets') as st:
+        # total_hrs > 10 (the NO_HOURS / SHORT_REPORT bits when the quality mask is there),
+        # kept as row positions: the sheets gather their rows from df_voyage as they are written
+        if 'quality' in df_voyage:
+            rows = rows_without(df_voyage, REPORT_DROP)
+        else:
+            rows = np.flatnonzero((df_voyage['total_hrs'] > 10).to_numpy())
+        n = len(rows)
+
+        wb = new_workbook()
+
+        # ---- Sheet 1 ----
+        if 'General Data' in sheets:
+            ws1 = wb.create_sheet("General Data")
+            append_table(ws1, df_voyage, ['telegram_date'] + general_columns, rows=rows)
+            add_bar_chart(ws1, "Fuel, FW, and Speed Performance", "I2", header_row=1, n_rows=n, min_col=2, max_col=6)
+
+            # Speed loss table below a blank row, dates on the X-axis
+            ws1.append([])
+            loss_header_row = n + 3
+            append_table(ws1, df_voyage, ['telegram_date'] + speed_loss_columns, header=["Date"] + speed_loss_columns,
+                         rows=rows)
+            add_bar_chart(ws1, "Speed Loss by Weather", "I20", header_row=loss_header_row, n_rows=n, min_col=2, max_col=4,
+                          x_title="Date", y_title="Speed Loss (Knots)")
+
+        # ---- Sheet 2 ----
+        if 'Main Engine Data' in sheets:
+            ws2 = wb.create_sheet("Main Engine Data")
+            append_table(ws2, df_voyage, ['telegram_date'] + main_engine_columns, rows=rows)
+            add_bar_chart(ws2, "Main Engine Metrics", "H2", header_row=1, n_rows=n, min_col=2, max_col=5)
+
+        # ---- Sheet 3 ----
+        if 'Aux. Engine & Boiler Data' in sheets:
+            ws3 = wb.create_sheet("Aux. Engine & Boiler Data")
+            append_table(ws3, df_voyage, ['telegram_date'] + aux_columns, rows=rows)
+            add_bar_chart(ws3, "Aux Engine and Boiler Metrics", "I2", header_row=1, n_rows=n, min_col=2, max_col=6)
+
+        # ---- Sheet 4 ----
+        if 'Summary' in sheets:
+            ws4 = wb.create_sheet("Summary")
+            append_table(ws4, df_summary, list(df_summary.columns))
+        st['rows'] = n
+
+    with stage('save_workbook') as st:
+        wb.save(output_path)
+        st['rows'] = n
+
+
+def run_voyage(df_data, voyage_start_date, voyage_end_date, output_path, sheets=None):
+    # The voyage stays a view of df_data plus its metric columns; write_report picks its rows
+    metrics = None if sheets is None else metric_plan(report_outputs(sheets))
+    df_voyage = voyage_metrics(voyage_slice(df_data, voyage_start_date, voyage_end_date), metrics, keep_flagged=True)
+    write_report(df_voyage, output_path, sheets)
+    return df_voyage
+
+
+# ---------------------- Batch Mode ----------------------
+# Several voyages (vessel, start, end, output name) from one loaded dataset.
+# Blank vessel = every row of the export; a vessel code the export does not have is
+# skipped with a warning.
+
+def read_voyage_table(voyage_table):
+    # A list of dicts, a DataFrame, or a .csv / .xlsx file with vessel, start, end, output columns
+    # (plus segment for tables from voyage_table_from_segments, see voyage_rows)
+    if isinstance(voyage_table, str):
+        if voyage_table.lower().endswith('.csv'):
+            voyage_table = pd.read_csv(voyage_table, dtype={'vessel': str})
+        else:
+            voyage_table = pd.read_excel(voyage_table, dtype={'vessel': str})
+    voyages = pd.DataFrame(voyage_table)
+    voyages['start'] = pd.to_datetime(voyages['start'])
+    voyages['end'] = pd.to_datetime(voyages['end'])
+    if 'vessel' not in voyages:
+        voyages['vessel'] = None
+    return voyages
+
+
+def voyage_rows(df_data, by_vessel, voyage):
+    # Rows of one voyage table entry before its date slice: the vessel's rows (every row for
+    # a blank vessel), None when the vessel is not in the export. An entry with a segment
+    # (see rawdata_segments.py) keeps only that segment's rows, so port telegrams dated the
+    # same day as the departure / arrival stay out of the voyage.
+    if pd.isna(voyage.vessel) or str(voyage.vessel).strip() == '':
+        rows = df_data
+    elif str(voyage.vessel).strip() in by_vessel:
+        rows = by_vessel[str(voyage.vessel).strip()]
+    else:
+        return None
+    segment = getattr(voyage, 'segment', None)
+    if segment is not None and not pd.isna(segment) and 'segment' in rows:
+        rows = rows[rows['segment'].to_numpy() == segment]
+    return rows
+
+
+def run_batch(df_data, voyage_table, output_dir):
+    # df_data: parsed export (load_telegrams) with add_daily_metrics applied, sorted by date.
+    # groupby keeps the date order inside each vessel, so every slice is still a binary search.
+    by_vessel = {str(code).strip(): rows for code, rows in df_data.groupby('vessel_code', sort=False, observed=True)}
+
+    written = []
+    for voyage in read_voyage_table(voyage_table).itertuples(index=False):
+        rows = voyage_rows(df_data, by_vessel, voyage)
+        if rows is None:
+            # No empty workbook for a vessel code that is not in the export
+            print(f"Warning: {voyage.output} skipped, vessel {str(voyage.vessel).strip()} has no telegrams in this export")
+            continue
+        output_path = os.path.join(output_dir, voyage.output)
+        df_voyage = run_voyage(rows, voyage.start, voyage.end, output_path)
+        print(f"{voyage.output}: {len(df_voyage)} telegrams ({voyage.start:%Y-%m-%d} to {voyage.end:%Y-%m-%d})")
+        written.append(output_path)
+    return written
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+# ---------------------- Propulsion Kernel ----------------------
+# Whole-column versions of the per-row speed / engine distance / slip lambdas used by the
+# analyzers. Every division is guarded: rows with zero (or missing) hours, RPM or pitch
+# get the fill value instead of a division by zero.
+
+METRES_PER_NM = 1852
+
+
+def _like(values, like):
+    # Keep the index of the input Series so the result can be assigned straight back
+    if isinstance(like, pd.Series):
+        return pd.Series(values, index=like.index)
+    return values
+
+
+def _arr(values):
+    return np.asarray(values, dtype=float)
+
+
+def guarded_divide(num, den, fill=0.0):
+    # num / den where den > 0, fill elsewhere
+    num, den = np.broadcast_arrays(_arr(num), _arr(den))
+    out = np.full(num.shape, fill, dtype=float)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+def actual_speed(miles, hours, fill=0.0):
+    # Speed over ground (knots) = miles / hours
+    return _like(guarded_divide(miles, hours, fill), miles)
+
+
+def engine_distance(rpm, pitch, hours):
+    # RPM * pitch (metres) * hours * 60 (min/hr), converted to NM; 0 when hours <= 0
+    rpm, pitch, h = _arr(rpm), _arr(pitch), _arr(hours)
+    with np.errstate(invalid='ignore'):
+        distance = np.where(h > 0, (rpm * pitch * h * 60) / METRES_PER_NM, 0.0)
+    return _like(distance, hours)
+
+
+def slip_percentage(miles, distance, fill=0.0):
+    # (1 - miles / engine distance) * 100; fill when engine distance <= 0
+    d = _arr(distance)
+    slip = np.where(d > 0, (1 - guarded_divide(miles, d, np.nan)) * 100, fill)
+    return _like(slip, miles)
+
+
+def performance_speed(rpm, pitch):
+    # Propeller speed (knots) with zero slip
+    return _like((_arr(rpm) * _arr(pitch) * 60) / METRES_PER_NM, rpm)
+
+
+def speed_slip(speed, rpm, pitch, fill=np.nan, scale=100):
+    # Slip from speed: 1 - speed / propeller speed, times scale (100 for %, 1 for a fraction).
+    # fill when RPM or pitch <= 0
+    speed, r, p = _arr(speed), _arr(rpm), _arr(pitch)
+    valid = (r > 0) & (p > 0)
+    prop = np.where(valid, r * p * 60, 1.0)
+    slip = np.where(valid, (1 - ((speed * METRES_PER_NM) / prop)) * scale, fill)
+    return _like(slip, rpm)
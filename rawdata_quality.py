@@ -0,0 +1,106 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# ---------------------- Telegram Quality Flags ----------------------
+# One bit per check, all checks OR-ed into a single uint16 'quality' column in one sweep
+# over the frame. Downstream filters test bits instead of re-deriving conditions (the
+# voyage filter drops NO_HOURS rows, the report also SHORT_REPORT ones), and the counts
+# are written next to the report so bad telegrams show up without a rerun.
+#
+# A check runs only when its columns are in the frame.
+
+MAX_SPEED_KNOTS = 30
+
+# name: (bit, columns, check, description)
+QUALITY_CHECKS = {
+    'MISSING_DATE': (1 << 0, ['telegram_date'], lambda d: d['telegram_date'].isna(),
+                     'telegram date missing or unreadable'),
+    'UNPARSEABLE_CELLS': (1 << 1, ['unparseable_cells'], lambda d: d['unparseable_cells'] > 0,
+                          'numeric cell(s) could not be read and were set to 0'),
+    'NO_HOURS': (1 << 2, ['total_hrs'], lambda d: ~(d['total_hrs'] > 0),
+                 'total hours since last telegram <= 0 (dropped by the voyage filter)'),
+    'SHORT_REPORT': (1 << 3, ['total_hrs'], lambda d: (d['total_hrs'] > 0) & ~(d['total_hrs'] > 10),
+                     'total hours <= 10 (left out of the report sheets)'),
+    'NEGATIVE_FO': (1 << 4, ['Daily FO Consumption (kL)'], lambda d: d['Daily FO Consumption (kL)'] < 0,
+                    'daily FO consumption below 0'),
+    'FW_ROB_JUMP': (1 << 5, ['Daily FW Consumption (kL)'], lambda d: d['Daily FW Consumption (kL)'] < 0,
+                    'FW ROB rose by more than bunkered + produced (negative FW consumption)'),
+    'COME_ROB_JUMP': (1 << 6, ['COME Consumption (L)'], lambda d: d['COME Consumption (L)'] < 0,
+                      'COME ROB rose by more than supplied (negative COME consumption)'),
+    'SLIP_RANGE': (1 << 7, ['Slip (%)'], lambda d: d['Slip (%)'].abs() > 100,
+                   'slip outside +/-100 %'),
+    'SPEED_RANGE': (1 << 8, ['Actual Speed (knots)'], lambda d: d['Actual Speed (knots)'] > MAX_SPEED_KNOTS,
+                    f'actual speed above {MAX_SPEED_KNOTS} knots'),
+    'WEATHER_UNREADABLE': (1 << 9, ['Speed Loss by Wind (knots)', 'Speed Loss by Swell (knots)', 'Speed Loss by Current (knots)'],
+                           lambda d: d[['Speed Loss by Wind (knots)', 'Speed Loss by Swell (knots)',
+                                        'Speed Loss by Current (knots)']].isna().any(axis=1),
+                           'weather speed loss could not be computed (unreadable force / course)'),
+}
+
+# Rows dropped by voyage_metrics / left out of the report sheets
+VOYAGE_DROP = QUALITY_CHECKS['NO_HOURS'][0]
+REPORT_DROP = VOYAGE_DROP | QUALITY_CHECKS['SHORT_REPORT'][0]
+
+
+def quality_flags(df_data):
+    # uint16 bitmask per row
+    flags = np.zeros(len(df_data), dtype=np.uint16)
+    for bit, columns, check, _ in QUALITY_CHECKS.values():
+        if all(col in df_data for col in columns):
+            with np.errstate(invalid='ignore'):
+                flags |= np.where(np.asarray(check(df_data), dtype=bool), bit, 0).astype(np.uint16)
+    return flags
+
+
+def rows_without(df_data, bits):
+    # Positions of the rows with none of bits set (for writers that gather their own rows)
+    return np.flatnonzero((df_data['quality'].to_numpy() & bits) == 0)
+
+
+def without_flags(df_data, bits):
+    # Rows with none of bits set, as a new frame
+    return df_data.iloc[rows_without(df_data, bits)]
+
+
+def flag_names(flags):
+    # 'FW_ROB_JUMP|SLIP_RANGE' style label per row ('' for clean rows)
+    flags = np.asarray(flags)
+    names = np.full(len(flags), '', dtype=object)
+    for name, (bit, _, _, _) in QUALITY_CHECKS.items():
+        hit = (flags & bit) != 0
+        names[hit] = np.where(names[hit] == '', name, names[hit] + '|' + name)
+    return names
+
+
+def quality_counts(flags):
+    # Telegrams per flag (a row can count under several flags)
+    flags = np.asarray(flags)
+    return {name: int(((flags & bit) != 0).sum()) for name, (bit, _, _, _) in QUALITY_CHECKS.items()}
+
+
+def quality_path(output_path):
+    return os.path.splitext(str(output_path))[0] + '.quality.json'
+
+
+def write_quality(df_voyage, output_path):
+    # Counts plus the flagged telegrams, as <output>.quality.json next to the workbook
+    flags = df_voyage['quality'].to_numpy()
+    flagged = np.flatnonzero(flags)
+    report = {
+        'telegrams': len(df_voyage),
+        'flagged': len(flagged),
+        'counts': quality_counts(flags),
+        'descriptions': {name: check[3] for name, check in QUALITY_CHECKS.items()},
+        'rows': pd.DataFrame({
+            'telegram_date': df_voyage['telegram_date'].iloc[flagged].astype(str).to_numpy(),
+            'telegram_type': df_voyage['telegram_type'].iloc[flagged].astype(str).to_numpy() if 'telegram_type' in df_voyage else '',
+            'flags': flag_names(flags[flagged]),
+        }).to_dict('records'),
+    }
+    path = quality_path(output_path)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return path
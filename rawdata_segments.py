@@ -0,0 +1,108 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from rawdata_timing import stage
+
+# ---------------------- Voyage Segmentation ----------------------
+# Splits each vessel's telegrams into voyages and port stays from telegram_type, so the
+# voyage windows no longer have to be typed in. One pass over the (vessel, date) sorted
+# arrays: the state after every telegram is that of the latest departure / arrival before
+# it (forward fill via maximum.accumulate), noon reports keep the current state.
+#
+#   departure -> at sea until the next arrival (the arrival telegram closes the voyage)
+#   arrival   -> in port until the next departure
+#
+# Telegrams before a vessel's first departure / arrival take the state that event implies
+# (at sea before an arrival, in port before a departure); a vessel without either is
+# 'unknown'. A departure while already at sea starts a new voyage.
+
+DEPARTURE_PATTERN = r'DEP|COSP'   # departure, commencement of sea passage
+ARRIVAL_PATTERN = r'ARR|EOSP'     # arrival, end of sea passage
+
+UNKNOWN, SEA, PORT = 0, 1, 2
+SEGMENT_KINDS = np.array(['unknown', 'voyage', 'port'])
+
+SEGMENT_COLUMNS = ['segment', 'vessel', 'kind', 'start', 'end', 'telegrams', 'first_type', 'last_type']
+
+
+def _match_types(types, pattern):
+    # Regex run once per distinct telegram type, then broadcast through the factor codes
+    codes, uniques = pd.factorize(pd.Series(types).astype('string').str.strip().str.upper())
+    hits = np.array([bool(re.search(pattern, u)) for u in uniques] + [False])
+    return hits[codes]   # code -1 (missing type) picks the trailing False
+
+
+def label_segments(vessels, dates, types, departure=DEPARTURE_PATTERN, arrival=ARRIVAL_PATTERN):
+    # Per-row segment number and kind (SEA / PORT / UNKNOWN), in the input row order
+    n = len(dates)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8)
+    vessel_codes = pd.factorize(pd.Series(vessels).astype('string'))[0]
+    order = np.lexsort((np.asarray(dates), vessel_codes))
+    codes = vessel_codes[order]
+    is_dep = _match_types(types, departure)[order]
+    is_arr = _match_types(types, arrival)[order] & ~is_dep
+    event = np.select([is_dep, is_arr], [SEA, PORT], UNKNOWN)
+
+    pos = np.arange(n)
+    new_vessel = np.r_[True, codes[1:] != codes[:-1]]
+    last_of_vessel = np.r_[new_vessel[1:], True]
+    group_start = np.maximum.accumulate(np.where(new_vessel, pos, 0))
+    group_last = np.minimum.accumulate(np.where(last_of_vessel, pos, n)[::-1])[::-1]
+
+    # Latest event at or before each row, and the first event at or after it (same vessel)
+    last_event = np.maximum.accumulate(np.where(event > 0, pos, -1))
+    next_event = np.minimum.accumulate(np.where(event > 0, pos, n)[::-1])[::-1]
+    has_last = last_event >= group_start
+    has_next = next_event <= group_last
+    before_first = np.where(has_next, np.where(event[np.minimum(next_event, n - 1)] == PORT, SEA, PORT), UNKNOWN)
+    state = np.where(has_last, event[np.maximum(last_event, 0)], before_first)
+
+    # The arrival telegram still belongs to the voyage it ends
+    prev_state = np.where(new_vessel, before_first, np.r_[UNKNOWN, state[:-1]])
+    kind = np.where(is_arr & (prev_state == SEA), SEA, state)
+
+    prev_kind = np.r_[UNKNOWN, kind[:-1]]
+    boundary = new_vessel | (kind != prev_kind) | (is_dep & (prev_kind == SEA))
+    segment_sorted = np.cumsum(boundary) - 1
+
+    segment = np.empty(n, dtype=np.int64)
+    segment[order] = segment_sorted
+    kinds = np.empty(n, dtype=np.int8)
+    kinds[order] = kind
+    return segment, kinds
+
+
+def segment_telegrams(df_data, departure=DEPARTURE_PATTERN, arrival=ARRIVAL_PATTERN):
+    # Adds segment / segment_kind columns to df_data and returns (df_data, segments table)
+    with stage('segments') as st:
+        vessels = df_data['vessel_code'] if 'vessel_code' in df_data else pd.Series('', index=df_data.index)
+        dated = df_data['telegram_date'].notna().to_numpy()
+        segment = np.full(len(df_data), -1, dtype=np.int64)
+        kinds = np.full(len(df_data), UNKNOWN, dtype=np.int8)
+        segment[dated], kinds[dated] = label_segments(vessels[dated].to_numpy(), df_data['telegram_date'][dated].to_numpy(),
+                                                      df_data['telegram_type'][dated].to_numpy(), departure, arrival)
+        df_data['segment'] = segment
+        df_data['segment_kind'] = pd.Categorical.from_codes(kinds, SEGMENT_KINDS)
+
+        rows = pd.DataFrame({'segment': segment, 'vessel': vessels.astype('string').fillna('').str.strip().to_numpy(),
+                             'kind': df_data['segment_kind'].to_numpy(), 'date': df_data['telegram_date'].to_numpy(),
+                             'type': df_data['telegram_type'].to_numpy()})[dated].sort_values(['segment', 'date'], kind='stable')
+        segments = rows.groupby('segment', sort=True).agg(
+            vessel=('vessel', 'first'), kind=('kind', 'first'), start=('date', 'min'), end=('date', 'max'),
+            telegrams=('date', 'size'), first_type=('type', 'first'), last_type=('type', 'last')).reset_index()
+        st['rows'] = len(df_data)
+    return df_data, segments[SEGMENT_COLUMNS]
+
+
+def voyage_table_from_segments(segments, name_format='{vessel}-VOY{number:02d}-{start:%Y%m%d}.xlsx'):
+    # Voyage segments as a run_batch voyage table (vessel, start, end, output, segment).
+    # run_batch takes the segment's rows (see voyage_rows), not everything between start and
+    # end: on date-only exports a port telegram can share the departure / arrival date.
+    voyages = segments[segments['kind'] == 'voyage'].copy()
+    voyages['number'] = voyages.groupby('vessel', sort=False).cumcount() + 1
+    voyages['output'] = [name_format.format(vessel=v.vessel or 'ALL', number=v.number, start=v.start, end=v.end)
+                         for v in voyages.itertuples(index=False)]
+    return voyages[['vessel', 'start', 'end', 'output', 'segment']].reset_index(drop=True)
@@ -0,0 +1,282 @@
+import io
+import json
+import math
+import os
+import threading
+import traceback
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from rawdata_layouts import load_export
+from rawdata_pipeline import (add_daily_metrics, metric_plan, report_outputs, report_sheets, summary_columns,
+                              summary_total_columns, voyage_metrics, voyage_slice, write_report)
+from rawdata_quality import REPORT_DROP, rows_without
+from rawdata_summary import summary_table
+from rawdata_writer import cell_values
+
+# ---------------------- Local Report Service ----------------------
+# A small HTTP API over warm, in-memory exports, for dashboards and ad-hoc requests:
+#
+#   GET /report?source=<name>&vessel=<code>&start=2024-01-01&end=2024-01-31
+#               &report=general,summary&format=json|xlsx
+#   GET /sources
+#
+# Each source (a raw 16-2 export) is loaded once (load_export + add_daily_metrics) and
+# kept in memory with its rows split by vessel; it is loaded again when the file's size or
+# modification time changes. A report runs the same steps as run_voyage on the voyage rows.
+# Results (the JSON body or the .xlsx bytes) are kept in an LRU cache keyed by the request
+# parameters and the source version, so a changed export never serves an old report.
+# report= takes REPORT_TYPES names (default: every sheet); blank vessel = every row.
+
+REPORT_TYPES = {
+    'general': 'General Data',
+    'main-engine': 'Main Engine Data',
+    'aux': 'Aux. Engine & Boiler Data',
+    'summary': 'Summary',
+}
+FORMATS = {
+    'json': 'application/json',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+CACHE_SIZE = 64
+
+
+class RequestError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def file_version(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class ResultCache:
+    # Least recently used results first; evicts past max_entries
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'max_entries': self.max_entries, 'hits': self.hits,
+                    'misses': self.misses}
+
+
+class Dataset:
+    # One export, prepared once per file version
+    def __init__(self, path):
+        self.path = path
+        self.version = None
+        self.df_data = None
+        self.by_vessel = {}
+        self.lock = threading.Lock()
+
+    def current(self):
+        # (version, frame, {vessel: rows}); reloads first if the file changed
+        with self.lock:
+            version = file_version(self.path)
+            if version != self.version:
+                df_data = add_daily_metrics(load_export(self.path))
+                self.by_vessel = {str(code).strip(): rows for code, rows in
+                                  df_data.groupby('vessel_code', sort=False, observed=True)} \
+                    if 'vessel_code' in df_data else {}
+                self.df_data, self.version = df_data, version
+            return self.version, self.df_data, self.by_vessel
+
+
+def json_values(values):
+    # cell_values, with dates as ISO strings and NaN as null
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return [None if pd.isna(v) else v.isoformat() for v in values]
+    out = []
+    for v in cell_values(values):
+        if isinstance(v, float) and not math.isfinite(v):
+            v = None
+        elif isinstance(v, np.generic):
+            v = v.item()
+        elif v is pd.NA or v is pd.NaT:
+            v = None
+        out.append(v)
+    return out
+
+
+def json_table(df, columns, rows=None):
+    columns = [col for col in columns if col in df]
+    take = df if rows is None else df.iloc[rows]
+    block = [json_values(take[col]) for col in columns]
+    return {'columns': columns, 'rows': [list(row) for row in zip(*block)]}
+
+
+def report_json(df_voyage, sheets):
+    # {sheet: {'columns', 'rows'}}: the rows and columns write_report puts on each sheet
+    rows = rows_without(df_voyage, REPORT_DROP) if 'quality' in df_voyage \
+        else np.flatnonzero((df_voyage['total_hrs'] > 10).to_numpy())
+    tables = {}
+    for sheet in sheets:
+        if sheet == 'Summary':
+            df_summary = summary_table(df_voyage, summary_columns, summary_total_columns)
+            tables[sheet] = json_table(df_summary, list(df_summary.columns))
+        else:
+            tables[sheet] = json_table(df_voyage, ['telegram_date'] + report_sheets[sheet], rows)
+    return tables
+
+
+class ReportService:
+    def __init__(self, sources, cache_size=CACHE_SIZE):
+        # sources: {name: path of a raw export}
+        self.datasets = {name: Dataset(path) for name, path in sources.items()}
+        self.cache = ResultCache(cache_size)
+
+    def warm(self):
+        for name, dataset in self.datasets.items():
+            _, df_data, by_vessel = dataset.current()
+            print(f"{name}: {len(df_data)} telegrams, {len(by_vessel)} vessels loaded", flush=True)
+
+    def sources(self):
+        listed = {}
+        for name, dataset in self.datasets.items():
+            version, df_data, by_vessel = dataset.current()
+            listed[name] = {
+                'file': os.path.basename(dataset.path),
+                'version': f"{version[0]}-{version[1]}",
+                'telegrams': len(df_data),
+                'vessels': sorted(by_vessel),
+                'first': df_data['telegram_date'].min().isoformat() if len(df_data) else None,
+                'last': df_data['telegram_date'].max().isoformat() if len(df_data) else None,
+            }
+        return {'sources': listed, 'cache': self.cache.stats()}
+
+    def parse_request(self, params):
+        # (source, vessel, start, end, sheets, format) from the query string
+        def param(name, default=None):
+            values = params.get(name)
+            return values[-1].strip() if values else default
+
+        source = param('source')
+        if source is None and len(self.datasets) == 1:
+            source = next(iter(self.datasets))
+        if source not in self.datasets:
+            raise RequestError(f"Unknown source {source!r}; one of {sorted(self.datasets)}", status=404)
+        try:
+            start, end = pd.Timestamp(param('start', '')), pd.Timestamp(param('end', ''))
+        except ValueError:
+            raise RequestError("start and end must be dates (YYYY-MM-DD or YYYY-MM-DD HH:MM)")
+        if pd.isna(start) or pd.isna(end):
+            raise RequestError("start and end are required")
+        if end < start:
+            raise RequestError("end is before start")
+        reports = [r.strip() for r in param('report', ','.join(REPORT_TYPES)).split(',') if r.strip()]
+        unknown = [r for r in reports if r not in REPORT_TYPES]
+        if unknown or not reports:
+            raise RequestError(f"Unknown report {', '.join(unknown) or '(none)'}; one of {', '.join(REPORT_TYPES)}")
+        sheets = tuple(REPORT_TYPES[r] for r in REPORT_TYPES if r in reports)
+        fmt = param('format', 'json').lower()
+        if fmt not in FORMATS:
+            raise RequestError(f"Unknown format {fmt!r}; one of {', '.join(FORMATS)}")
+        return source, param('vessel', ''), start, end, sheets, fmt
+
+    def report(self, params):
+        # (content type, body bytes, cache hit)
+        source, vessel, start, end, sheets, fmt = self.parse_request(params)
+        version, df_data, by_vessel = self.datasets[source].current()
+        key = (source, version, vessel, start, end, sheets, fmt)
+        body = self.cache.get(key)
+        if body is not None:
+            return FORMATS[fmt], body, True
+
+        if vessel:
+            if vessel not in by_vessel:
+                raise RequestError(f"No telegrams for vessel {vessel!r} in {source}", status=404)
+            rows = by_vessel[vessel]
+        else:
+            rows = df_data
+        df_voyage = voyage_metrics(voyage_slice(rows, start, end), metric_plan(report_outputs(list(sheets))),
+                                   keep_flagged=True)
+        if fmt == 'xlsx':
+            buffer = io.BytesIO()
+            write_report(df_voyage, buffer, list(sheets))
+            body = buffer.getvalue()
+        else:
+            body = json.dumps({
+                'source': source, 'vessel': vessel or None,
+                'start': start.isoformat(), 'end': end.isoformat(),
+                'telegrams': len(df_voyage),
+                'sheets': report_json(df_voyage, sheets),
+            }).encode()
+        self.cache.put(key, body)
+        return FORMATS[fmt], body, False
+
+
+class ReportHandler(BaseHTTPRequestHandler):
+    service = None   # set by serve()
+
+    def send_body(self, status, content_type, body, headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload):
+        self.send_body(status, FORMATS['json'], json.dumps(payload).encode())
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        try:
+            if url.path == '/report':
+                content_type, body, hit = self.service.report(params)
+                headers = [('X-Cache', 'hit' if hit else 'miss')]
+                if content_type == FORMATS['xlsx']:
+                    name = f"{params.get('source', ['report'])[-1]}-{params.get('vessel', ['all'])[-1] or 'all'}.xlsx"
+                    headers.append(('Content-Disposition', f'attachment; filename="{name}"'))
+                self.send_body(200, content_type, body, headers)
+            elif url.path == '/sources':
+                self.send_json(200, self.service.sources())
+            else:
+                self.send_json(404, {'error': f"Unknown path {url.path}; use /report or /sources"})
+        except RequestError as e:
+            self.send_json(e.status, {'error': str(e)})
+        except Exception:
+            traceback.print_exc()
+            self.send_json(500, {'error': traceback.format_exc(limit=1).strip().splitlines()[-1]})
+
+    def log_message(self, format, *args):
+        print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {self.address_string()} {format % args}", flush=True)
+
+
+def serve(sources, host='127.0.0.1', port=8016, cache_size=CACHE_SIZE):
+    # Loads every source, then serves until interrupted
+    service = ReportService(sources, cache_size)
+    service.warm()
+    handler = type('Handler', (ReportHandler,), {'service': service})
+    with ThreadingHTTPServer((host, port), handler) as server:
+        print(f"Serving reports on http://{host}:{port}/report", flush=True)
+        server.serve_forever()
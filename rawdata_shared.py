@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+
+# ---------------------- Shared-Memory Telegram Frame ----------------------
+# The prepared frame (load_telegrams + add_daily_metrics) is copied once into a single
+# shared memory block: one fixed-width array per column at its own offset, categorical and
+# text columns as their integer codes. Worker processes attach to the block and wrap the
+# arrays in a DataFrame without copying them, so every worker reads the same physical
+# memory instead of unpickling its own copy.
+#
+# The spec returned by publish_frame is all a worker needs (block name, offsets, dtypes,
+# categories) and is small enough to pass as a pool initializer argument. Attached arrays
+# are read-only; derived columns go on copies as usual (copy-on-write). Text columns come
+# back as categoricals.
+#
+# Per vessel, the row positions (in date order) are stored in the block as well, so a
+# worker finds a vessel's voyage window by binary search without scanning the frame.
+
+ALIGN = 64
+
+
+def _layout(df_data):
+    # (column, numpy array to store, categories or None) per column
+    columns = []
+    for col in df_data.columns:
+        values = df_data[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            columns.append((col, values.array.codes, list(values.cat.categories)))
+        elif isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biufmM':
+            columns.append((col, values.to_numpy(), None))
+        else:
+            codes, uniques = pd.factorize(values)
+            columns.append((col, codes.astype(np.int32), list(uniques)))
+    return columns
+
+
+def vessel_positions(df_data):
+    # {vessel: (start, stop)} into one positions array holding each vessel's rows in frame order
+    if 'vessel_code' not in df_data:
+        return {}, np.zeros(0, dtype=np.int64)
+    codes, uniques = pd.factorize(df_data['vessel_code'].astype('string').fillna('').str.strip())
+    positions = np.argsort(codes, kind='stable')
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(uniques)))])
+    return {str(v): (int(bounds[i]), int(bounds[i + 1])) for i, v in enumerate(uniques)}, positions
+
+
+def publish_frame(df_data):
+    # Copies df_data (RangeIndex expected) into a new shared memory block.
+    # Returns (spec, shm); the caller keeps shm open while workers run, then release_frame(shm).
+    columns = _layout(df_data)
+    vessels, positions = vessel_positions(df_data)
+    arrays = columns + [(None, positions, None)]
+
+    offsets, size = [], 0
+    for _, arr, _ in arrays:
+        offsets.append(size)
+        size += -(-arr.nbytes // ALIGN) * ALIGN
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+    spec = {'name': shm.name, 'rows': len(df_data), 'columns': [], 'vessels': vessels}
+    for (col, arr, categories), offset in zip(arrays, offsets):
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf, offset=offset)[:] = arr
+        entry = {'dtype': arr.dtype.str, 'offset': offset, 'length': len(arr)}
+        if col is None:
+            spec['positions'] = entry
+        else:
+            spec['columns'].append(dict(entry, name=col, categories=categories))
+    return spec, shm
+
+
+def release_frame(shm):
+    shm.close()
+    shm.unlink()
+
+
+def _attach(name):
+    # Without tracking where available (Python 3.13+): the publisher owns the block. Pool
+    # workers share the publisher's resource tracker on older versions, so their attach
+    # does not unlink it when they exit either.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _view(shm, entry):
+    arr = np.ndarray((entry['length'],), dtype=np.dtype(entry['dtype']), buffer=shm.buf, offset=entry['offset'])
+    arr.flags.writeable = False
+    return arr
+
+
+def attach_frame(spec):
+    # (DataFrame over the shared arrays, vessel positions, shm); close shm when done
+    shm = _attach(spec['name'])
+    data = {}
+    for entry in spec['columns']:
+        arr = _view(shm, entry)
+        if entry['categories'] is not None:
+            arr = pd.Categorical.from_codes(arr, entry['categories'])
+        data[entry['name']] = arr
+    df_data = pd.DataFrame(data, columns=[entry['name'] for entry in spec['columns']], copy=False)
+    return df_data, _view(shm, spec['positions']), shm
+
+
+def vessel_window(df_data, positions, vessels, vessel, voyage_start_date, voyage_end_date):
+    # Rows of one vessel (blank / None = every row) inside the inclusive date window.
+    # The whole-frame case is a slice (no copy); a vessel's window is gathered from its
+    # positions, so only the voyage rows are copied.
+    dates = df_data['telegram_date'].to_numpy()
+    start, end = np.datetime64(voyage_start_date), np.datetime64(voyage_end_date)
+    if vessel is None or pd.isna(vessel) or str(vessel).strip() == '':
+        lo, hi = np.searchsorted(dates, start, side='left'), np.searchsorted(dates, end, side='right')
+        return df_data.iloc[lo:hi]
+    first, stop = vessels.get(str(vessel).strip(), (0, 0))
+    rows = positions[first:stop]
+    vessel_dates = dates[rows]
+    lo, hi = np.searchsorted(vessel_dates, start, side='left'), np.searchsorted(vessel_dates, end, side='right')
+    return df_data.take(rows[lo:hi])
@@ -0,0 +1,117 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+from rawdata_loader import parse_telegrams, read_columns
+from rawdata_pipeline import col_map, numeric_cols, add_daily_metrics, compute_metrics, metric_plan
+from rawdata_timing import stage
+
+# ---------------------- Telegram Store ----------------------
+# Optional SQLite database (standard library, one file) holding every imported telegram:
+# the col_map fields plus all derived metrics, indexed on (vessel_code, telegram_date).
+# Voyage slices and cross-file questions ("all vessels, Q1, slip > 10%") are then queries
+# instead of Excel reads.
+#
+# Importing an export replaces the stored telegrams of its vessels inside the export's
+# date range, so re-importing a grown export does not duplicate rows. Derived columns keep
+# their report names; quote them in SQL, e.g. "Slip (%)" > 10.
+
+TABLE = 'telegrams'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def open_store(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {TABLE} (source TEXT, vessel_code TEXT, telegram_date TEXT)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_vessel_date ON {TABLE} (vessel_code, telegram_date)")
+    return conn
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _ensure_columns(conn, columns):
+    # New col_map fields / metrics become new columns; existing rows read NULL there
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({TABLE})")}
+    for col in columns:
+        if col not in existing:
+            conn.execute(f"ALTER TABLE {TABLE} ADD COLUMN {_quote(col)}")
+
+
+def derive_all(df_data):
+    # Every derived metric on every telegram (voyage_metrics would drop total_hrs <= 0 rows)
+    metrics = metric_plan()
+    df_data = add_daily_metrics(df_data, metrics)
+    compute_metrics(df_data, metrics, 'propulsion')
+    compute_metrics(df_data, metrics, 'weather_loss')
+    return df_data
+
+
+def import_export(conn, file_path, col_map=col_map, numeric_cols=numeric_cols):
+    # Reads one raw export through col_map and stores it; returns the number of telegrams
+    df_data = parse_telegrams(read_columns(file_path, col_map), numeric_cols, source=file_path)
+    df_data = df_data[df_data['telegram_date'].notna()].reset_index(drop=True)
+    if df_data.empty:
+        return 0
+    df_data = derive_all(df_data)
+
+    with stage('store_import') as st:
+        if 'vessel_code' not in df_data:
+            df_data['vessel_code'] = ''
+        df_data['vessel_code'] = df_data['vessel_code'].astype('string').fillna('').str.strip()
+        df_data['telegram_date'] = df_data['telegram_date'].dt.strftime(DATE_FORMAT)
+        df_data.insert(0, 'source', os.path.basename(str(file_path)))
+
+        with conn:
+            _ensure_columns(conn, df_data.columns)
+            spans = df_data.groupby('vessel_code', sort=False)['telegram_date'].agg(['min', 'max'])
+            for vessel, span in spans.iterrows():
+                conn.execute(f"DELETE FROM {TABLE} WHERE vessel_code = ? AND telegram_date BETWEEN ? AND ?",
+                             (vessel, span['min'], span['max']))
+            placeholders = ', '.join('?' * len(df_data.columns))
+            conn.executemany(f"INSERT INTO {TABLE} ({', '.join(map(_quote, df_data.columns))}) VALUES ({placeholders})",
+                             df_data.astype(object).where(df_data.notna(), None).itertuples(index=False, name=None))
+        st['rows'] = len(df_data)
+    return len(df_data)
+
+
+def query(conn, sql, params=()):
+    # Any SQL over the store; telegram_date comes back as datetime
+    df = pd.read_sql_query(sql, conn, params=params)
+    if 'telegram_date' in df:
+        df['telegram_date'] = pd.to_datetime(df['telegram_date'])
+    return df
+
+
+def query_telegrams(conn, vessels=None, start=None, end=None, where=None, columns=None, params=()):
+    # Telegrams by vessel(s) and inclusive date range (both optional) plus an extra SQL
+    # condition, in (vessel_code, telegram_date) order - the index order
+    conditions, args = [], []
+    if vessels is not None:
+        vessels = [vessels] if isinstance(vessels, str) else list(vessels)
+        conditions.append(f"vessel_code IN ({', '.join('?' * len(vessels))})")
+        args.extend(vessels)
+    if start is not None:
+        conditions.append("telegram_date >= ?")
+        args.append(pd.Timestamp(start).strftime(DATE_FORMAT))
+    if end is not None:
+        conditions.append("telegram_date <= ?")
+        args.append(pd.Timestamp(end).strftime(DATE_FORMAT))
+    if where:
+        conditions.append(f"({where})")
+        args.extend(params)
+    select = '*' if columns is None else ', '.join(map(_quote, columns))
+    sql = f"SELECT {select} FROM {TABLE}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return query(conn, sql + " ORDER BY vessel_code, telegram_date", args)
+
+
+def query_voyage(conn, vessel, voyage_start_date, voyage_end_date):
+    # Voyage slice with its daily metrics, ready for voyage_metrics() / write_report()
+    with stage('store_query') as st:
+        df_voyage = query_telegrams(conn, vessel, voyage_start_date, voyage_end_date)
+        st['rows'] = len(df_voyage)
+    return df_voyage
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+# ---------------------- Summary Statistics ----------------------
+# Means, totals and telegram counts by sailing-hours threshold, Beaufort band and telegram
+# type. Rows are binned once (disjoint hours bands between the thresholds, wind band, type)
+# and reduced in a single grouped aggregation to per-bin sums and non-empty counts. Every
+# "> N hrs" threshold and every 'All' roll-up is then a sum over those few bins, since sums
+# and counts add up; the frame itself is never re-filtered per threshold.
+#
+# Wind bands need wind_force and types need telegram_type; without the column only the
+# 'All' rows are written.
+
+# total_hrs > N; > 10 is the AVERAGE (>10hrs) row and > 20 the 'Filtered Sailing' sheet of rawdata-analyzer7.py
+HOURS_THRESHOLDS = [0, 10, 20]
+
+# Beaufort band label -> highest force in the band
+WIND_BANDS = {'BF 0-3': 3, 'BF 4-5': 5, 'BF 6-7': 7, 'BF 8-12': 12}
+
+ALL = 'All'
+UNKNOWN_BAND = 'unknown'
+NO_TYPE = '(none)'
+
+
+def hours_bins(total_hrs, thresholds):
+    # Number of thresholds below each row's total_hrs: bin k counts for thresholds[:k]
+    hrs = np.asarray(total_hrs, dtype=float)
+    bins = np.searchsorted(thresholds, hrs, side='left')
+    bins[np.isnan(hrs)] = 0
+    return bins
+
+
+def wind_bins(wind_force, wind_bands=WIND_BANDS):
+    # Index into wind_bands; len(wind_bands) for missing / out of range forces
+    force = np.asarray(wind_force, dtype=float)
+    bins = np.searchsorted(list(wind_bands.values()), force, side='left')
+    bins[np.isnan(force) | (force < 0)] = len(wind_bands)
+    return bins
+
+
+def summary_table(df_voyage, columns, total_columns=(), thresholds=HOURS_THRESHOLDS, wind_bands=WIND_BANDS):
+    # One row per (threshold, wind band, telegram type) that has telegrams, 'All' roll-ups
+    # included: Telegrams, Sailing Hours, 'Mean <col>' per column and 'Total <col>' per total column
+    thresholds = sorted(thresholds)
+    columns = [col for col in columns if col in df_voyage]
+    total_columns = [col for col in total_columns if col in df_voyage]
+    has_wind = 'wind_force' in df_voyage
+    has_type = 'telegram_type' in df_voyage
+
+    n = len(df_voyage)
+    keys = {
+        'hours': hours_bins(df_voyage['total_hrs'], thresholds),
+        'wind': wind_bins(df_voyage['wind_force'], wind_bands) if has_wind else np.zeros(n, dtype=np.int64),
+    }
+    if has_type:
+        types = df_voyage['telegram_type'].astype('string').str.strip().fillna('').replace('', NO_TYPE)
+        keys['type'], type_labels = pd.factorize(types, sort=True)
+    else:
+        keys['type'], type_labels = np.zeros(n, dtype=np.int64), []
+
+    value_columns = list(dict.fromkeys(['total_hrs'] + columns + total_columns))
+    values = df_voyage[value_columns].astype('float64').reset_index(drop=True)
+    values['telegrams'] = 1
+    fine = values.groupby([pd.Index(v, name=k) for k, v in keys.items()], sort=False).agg(['sum', 'count'])
+    fine.columns = [f'{stat}:{col}' for col, stat in fine.columns]
+
+    # Roll-ups over the per-bin sums: -1 marks 'All' on the wind / type level
+    rollups = [[]] + ([['wind']] if has_wind else []) + ([['type']] if has_type else []) + ([['wind', 'type']] if has_wind and has_type else [])
+    parts = []
+    for i in range(len(thresholds)):
+        rows = fine[fine.index.get_level_values('hours') > i]
+        for levels in rollups:
+            part = rows.groupby(level=levels, sort=False).sum().reset_index() if levels else rows.sum().to_frame().T
+            for level in ('wind', 'type'):
+                if level not in levels:
+                    part[level] = -1
+            part['hours'] = i
+            parts.append(part)
+    table = pd.concat(parts, ignore_index=True).sort_values(['hours', 'wind', 'type'], kind='stable')
+
+    def mean(col):
+        count = table[f'count:{col}'].to_numpy(dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(count > 0, table[f'sum:{col}'].to_numpy(dtype=float) / count, np.nan)
+
+    wind_labels = np.array(list(wind_bands) + [UNKNOWN_BAND, ALL], dtype=object)   # -1 picks ALL
+    type_labels = np.array(list(type_labels) + [ALL], dtype=object)
+    summary = pd.DataFrame({
+        'Hours': [f'> {thresholds[i]:g} hrs' for i in table['hours'].astype(int)],
+        'Wind Force': wind_labels[table['wind'].astype(int).to_numpy()],
+        'Telegram Type': type_labels[table['type'].astype(int).to_numpy()],
+        'Telegrams': table['sum:telegrams'].astype('int64').to_numpy(),
+        'Sailing Hours': table['sum:total_hrs'].to_numpy(dtype=float),
+    })
+    for col in columns:
+        summary[f'Mean {col}'] = mean(col)
+    for col in total_columns:
+        summary[f'Total {col}'] = table[f'sum:{col}'].to_numpy(dtype=float)
+    return summary
@@ -0,0 +1,86 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+# ---------------------- Stage Instrumentation ----------------------
+# Wall time and row count per pipeline stage, written as JSON next to the output workbook.
+# The loader / pipeline modules wrap their steps in stage(); nothing is recorded unless
+# start_run() was called.
+#
+# Memory: the process peak RSS so far is recorded after every stage where the OS reports
+# it (free). trace_memory=True adds the peak Python allocation per stage via tracemalloc,
+# which slows allocation-heavy stages (read_excel) down several times over, so it is for
+# profiling runs only.
+
+_run = None
+
+
+def peak_rss_mb():
+    # Peak resident memory of this process so far; None where unavailable
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == 'darwin' else 2**10), 2)   # bytes on macOS, KiB elsewhere
+
+
+def start_run(trace_memory=False, **info):
+    global _run
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _run = {'info': info, 'started': datetime.now().isoformat(timespec='seconds'),
+            't0': time.perf_counter(), 'trace_memory': trace_memory, 'peak': 0, 'stages': []}
+    return _run
+
+
+@contextmanager
+def stage(name):
+    # Yields a dict; set ['rows'] inside the block to record how many rows the stage handled
+    record = {'name': name, 'rows': None}
+    if _run is None:
+        yield record
+        return
+    if _run['trace_memory']:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = round(time.perf_counter() - started, 4)
+        record['peak_rss_mb'] = peak_rss_mb()
+        if _run['trace_memory']:
+            peak = tracemalloc.get_traced_memory()[1]
+            _run['peak'] = max(_run['peak'], peak)
+            record['peak_memory_mb'] = round((peak - base) / 2**20, 2)
+        _run['stages'].append(record)
+
+
+def timing_path(output_path):
+    return os.path.splitext(str(output_path))[0] + '.timing.json'
+
+
+def finish_run(output_path=None):
+    # Ends the run and writes the report (to <output>.timing.json when output_path is given)
+    global _run
+    run, _run = _run, None
+    if run is None:
+        return None
+    report = dict(run['info'])
+    report.update(started=run['started'], total_seconds=round(time.perf_counter() - run['t0'], 4),
+                  stages=run['stages'], peak_rss_mb=peak_rss_mb())
+    if run['trace_memory']:
+        report['peak_memory_mb'] = round(max(run['peak'], tracemalloc.get_traced_memory()[1]) / 2**20, 2)
+        tracemalloc.stop()
+    if output_path is not None:
+        with open(timing_path(output_path), 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+    return report
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import time
+import traceback
+from datetime import datetime
+
+import pandas as pd
+
+from rawdata_fleet import RAW_EXTENSIONS
+from rawdata_layouts import load_export
+from rawdata_pipeline import add_daily_metrics, read_voyage_table, run_batch, voyage_rows, voyage_slice
+from rawdata_segments import segment_telegrams, voyage_table_from_segments
+
+# ---------------------- Watch-Folder Service ----------------------
+# Polls an input folder for new or changed raw exports and regenerates only the voyage
+# reports whose telegrams changed. A file is queued when its size / modification time
+# changes and taken from the queue once it has been unchanged for debounce_seconds, so a
+# download still being written, or several saves in a row, cost one run. Files are
+# processed one at a time, oldest change first.
+#
+# Voyages come from the telegram types (see rawdata_segments.py) unless a voyage table is
+# given. Each voyage is fingerprinted by a hash of its derived rows, which include the
+# lagged deltas from the telegram before it. Only voyages with a new fingerprint (or a
+# missing workbook) are written again. Fingerprints and file signatures are kept in
+# watch-state.json in the output folder, so a restart does not redo finished work.
+#
+# Reports go to <output_dir>/<export name>/.
+
+POLL_SECONDS = 5
+DEBOUNCE_SECONDS = 30
+STATE_FILE = 'watch-state.json'
+
+
+def log(message):
+    print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {message}", flush=True)
+
+
+def scan(input_dir):
+    # {path: (size, mtime_ns)} of the raw exports in input_dir (Excel lock files skipped)
+    files = {}
+    for entry in os.scandir(input_dir):
+        stem, ext = os.path.splitext(entry.name)
+        if entry.is_file() and ext.lower() in RAW_EXTENSIONS and not stem.startswith('~$'):
+            stat = entry.stat()
+            files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def read_watch_state(output_dir):
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_watch_state(output_dir, state):
+    path = os.path.join(output_dir, STATE_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def voyage_fingerprints(df_data, voyages):
+    # {output: hash of the voyage's derived rows}, rows cut the same way as run_batch. The
+    # segment numbers run across the whole export, so they are left out of the hash: telegrams
+    # added for one vessel renumber the segments of the vessels after it.
+    by_vessel = {str(code).strip(): rows for code, rows in df_data.groupby('vessel_code', sort=False, observed=True)} \
+        if 'vessel_code' in df_data else {}
+    fingerprints = {}
+    for voyage in voyages.itertuples(index=False):
+        rows = voyage_rows(df_data, by_vessel, voyage)
+        rows = voyage_slice(df_data.iloc[0:0] if rows is None else rows, voyage.start, voyage.end)
+        rows = rows.drop(columns=['segment', 'segment_kind'], errors='ignore')
+        hashed = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+        fingerprints[voyage.output] = hashlib.sha1(hashed.tobytes()).hexdigest()
+    return fingerprints
+
+
+def process_export(file_path, output_dir, known, voyage_table=None):
+    # Regenerates the changed voyages of one export; returns (fingerprints, outputs written)
+    df_data = add_daily_metrics(load_export(file_path))
+    if voyage_table is None:
+        df_data, segments = segment_telegrams(df_data)
+        voyages = voyage_table_from_segments(segments)
+    else:
+        voyages = read_voyage_table(voyage_table)
+
+    report_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(file_path))[0])
+    os.makedirs(report_dir, exist_ok=True)
+    fingerprints = voyage_fingerprints(df_data, voyages)
+    changed = voyages[[known.get(output) != fingerprints[output] or not os.path.exists(os.path.join(report_dir, output))
+                       for output in voyages['output']]]
+    written = run_batch(df_data, changed, report_dir) if len(changed) else []
+    return fingerprints, written
+
+
+def watch(input_dir, output_dir, voyage_table=None, poll_seconds=POLL_SECONDS, debounce_seconds=DEBOUNCE_SECONDS,
+          once=False):
+    # Runs until interrupted; once=True processes what is there now (no debounce) and returns
+    os.makedirs(output_dir, exist_ok=True)
+    state = read_watch_state(output_dir)
+    pending = {}   # path -> (signature, monotonic time of the last change); the queue, in insertion order
+    log(f"Watching {input_dir} -> {output_dir}")
+    while True:
+        now = time.monotonic()
+        files = scan(input_dir)
+        for path, signature in files.items():
+            done = state.get(os.path.basename(path), {}).get('signature')
+            if done is not None and tuple(done) == signature:
+                pending.pop(path, None)
+            elif path not in pending or pending[path][0] != signature:
+                pending[path] = (signature, now)
+        for path in [p for p in pending if p not in files]:
+            del pending[path]
+
+        ready = [path for path, (_, changed_at) in pending.items() if once or now - changed_at >= debounce_seconds]
+        for path in ready:
+            signature, _ = pending.pop(path)
+            name = os.path.basename(path)
+            entry = state.get(name, {})
+            started = time.perf_counter()
+            try:
+                fingerprints, written = process_export(path, output_dir, entry.get('voyages', {}), voyage_table)
+                entry = {'signature': list(signature), 'voyages': fingerprints, 'error': ''}
+                log(f"{name}: {len(written)} of {len(fingerprints)} voyage reports regenerated "
+                    f"in {time.perf_counter() - started:.1f}s")
+            except Exception:
+                # Not retried until the file changes again
+                entry = dict(entry, signature=list(signature), error=traceback.format_exc(limit=3).strip())
+                log(f"{name}: FAILED\n{entry['error']}")
+            state[name] = entry
+            write_watch_state(output_dir, state)
+
+        if once:
+            return state
+        time.sleep(poll_seconds)
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+# ---------------------- Speed Loss Tables ----------------------
+# Same bins as the per-row wind/swell/current functions in rawdata-analyzer13 to 16-2,
+# laid out as arrays so whole columns can be looked up at once.
+
+# Wind: Beaufort force (truncated to int) -> fraction of performance speed
+WIND_LOSS_TABLE = np.array([0.00, 0.00, 0.00, 0.015, 0.03, 0.05, 0.075, 0.10, 0.13, 0.17, 0.22, 0.28, 0.35])
+
+# Swell / current: force <= edge[i] falls in bin i, anything above the last edge in the last bin
+SWELL_FORCE_EDGES = np.array([0.5, 1.0, 2.0, 3.0, 4.0, 5.0])
+SWELL_LOSS_TABLE = np.array([0.00, 0.01, 0.025, 0.05, 0.08, 0.12, 0.15])
+
+CURRENT_FORCE_EDGES = np.array([0.2, 0.5, 1.0, 1.5, 2.0])
+CURRENT_LOSS_TABLE = np.array([0.00, 0.005, 0.01, 0.02, 0.035, 0.05])
+
+
+def _to_float(values):
+    # Mirrors float(value): returns the float array plus a mask of entries float() would reject
+    s = pd.Series(values).reset_index(drop=True)
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        arr = s.to_numpy(dtype=float, na_value=np.nan)
+        return arr, np.zeros(len(arr), dtype=bool)
+    arr = pd.to_numeric(s, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    # A plain float NaN is accepted by float(); None, pd.NA and unparseable text are not
+    is_float_nan = s.map(lambda v: isinstance(v, float) and v != v).to_numpy(dtype=bool)
+    return arr, np.isnan(arr) & ~is_float_nan
+
+
+def relative_effect(vessel_course, weather_course):
+    # +1 for head weather (within 90 degrees of the vessel course), -1 otherwise
+    with np.errstate(invalid='ignore'):
+        angle = np.abs(np.asarray(vessel_course, dtype=float) - np.asarray(weather_course, dtype=float)) % 360
+    angle = np.where(angle > 180, 360 - angle, angle)
+    return np.where(angle < 90, 1.0, -1.0)
+
+
+def wind_speed_loss(force):
+    force = np.asarray(force, dtype=float)
+    loss = np.full(force.shape, np.nan)
+    finite = np.isfinite(force)
+    idx = np.trunc(force[finite])
+    in_table = (idx >= 0) & (idx < len(WIND_LOSS_TABLE))
+    loss[finite] = np.where(in_table, WIND_LOSS_TABLE[np.clip(idx, 0, len(WIND_LOSS_TABLE) - 1).astype(int)], 0.0)
+    return loss
+
+
+def swell_speed_loss(force):
+    return SWELL_LOSS_TABLE[np.searchsorted(SWELL_FORCE_EDGES, np.asarray(force, dtype=float), side='left')]
+
+
+def current_speed_loss(force):
+    return CURRENT_LOSS_TABLE[np.searchsorted(CURRENT_FORCE_EDGES, np.asarray(force, dtype=float), side='left')]
+
+
+def speed_loss(df, force_col, course_col, loss_func, speed_col='Performance Speed (knots)'):
+    # Column-wise equivalent of safe_calc_loss: loss fraction * performance speed * direction,
+    # NaN wherever one of the inputs could not be read as a float
+    force, bad_force = _to_float(df[force_col])
+    ps, bad_ps = _to_float(df[speed_col])
+    vc, bad_vc = _to_float(df['vessel_course'])
+    wc, bad_wc = _to_float(df[course_col])
+
+    with np.errstate(invalid='ignore'):
+        loss = loss_func(force) * ps * relative_effect(vc, wc)
+    loss[bad_force | bad_ps | bad_vc | bad_wc] = np.nan
+    return pd.Series(loss, index=df.index)
+
+
+def add_weather_speed_loss(df, speed_col='Performance Speed (knots)'):
+    df['Speed Loss by Wind (knots)'] = speed_loss(df, 'wind_force', 'wind_course', wind_speed_loss, speed_col)
+    df['Speed Loss by Swell (knots)'] = speed_loss(df, 'swell_force', 'swell_course', swell_speed_loss, speed_col)
+    df['Speed Loss by Current (knots)'] = speed_loss(df, 'current_force', 'current_course', current_speed_loss, speed_col)
+    return df
@@ -0,0 +1,50 @@
+from openpyxl import Workbook
+from openpyxl.chart import BarChart, Reference
+
+# ---------------------- Streaming Excel Writer ----------------------
+# Report sheets are written with openpyxl's write-only (constant memory) mode: rows are
+# streamed to disk as they are appended instead of living in an in-memory Workbook.
+# Rows are built column-wise from each table in fixed-size chunks, so no per-row .iloc
+# lookups and no full copy of the table as Python objects.
+# A filtered table is passed as the full frame plus the row positions to write; rows are
+# gathered per chunk, so the filtered frame itself is never built.
+
+CHUNK_ROWS = 10000
+
+
+def new_workbook():
+    return Workbook(write_only=True)
+
+
+def cell_values(values):
+    # Python values of a column (NaN stays NaN; openpyxl writes it as an empty cell)
+    return values.tolist()
+
+
+def append_table(ws, df, columns, header=None, rows=None, chunk_rows=CHUNK_ROWS):
+    # Header row, then one row per frame row (or per position in rows); returns the number
+    # of data rows written
+    ws.append(list(columns if header is None else header))
+    n = len(df) if rows is None else len(rows)
+    for start in range(0, n, chunk_rows):
+        take = slice(start, start + chunk_rows) if rows is None else rows[start:start + chunk_rows]
+        block = [cell_values(df[col].iloc[take]) for col in columns]
+        for row in zip(*block):
+            ws.append(row)
+    return n
+
+
+def add_bar_chart(ws, title, anchor, header_row, n_rows, min_col, max_col, cat_col=1, x_title=None, y_title=None):
+    # Series from columns min_col..max_col with titles taken from header_row, categories
+    # from cat_col; same references the reports built on in-memory sheets
+    chart = BarChart()
+    chart.title = title
+    last_row = header_row + n_rows
+    chart.add_data(Reference(ws, min_col=min_col, min_row=header_row, max_col=max_col, max_row=last_row), titles_from_data=True)
+    chart.set_categories(Reference(ws, min_col=cat_col, min_row=header_row, max_row=last_row))
+    if x_title:
+        chart.x_axis.title = x_title
+    if y_title:
+        chart.y_axis.title = y_title
+    ws.add_chart(chart, anchor)
+    return chart